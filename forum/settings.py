@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'forumapp.timing.TimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -58,7 +59,7 @@ ROOT_URLCONF = 'forum.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'forumapp.timing.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -127,7 +128,7 @@ REST_FRAMEWORK = {
         # 'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'forumapp.authentication.CachingTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
@@ -139,3 +140,62 @@ REST_FRAMEWORK = {
 CORS_ORIGIN_WHITELIST = (
     'localhost:3000'
 )
+
+# Forum app
+
+# Ban expiries are cached per process; bans issued through the app
+# invalidate the entry immediately, other changes apply after the TTL.
+FORUMAPP_BAN_CACHE_TTL = 60
+FORUMAPP_BAN_CACHE_SIZE = 10000
+
+# Authenticated tokens are cached per process. Deleted tokens are evicted
+# from the deleting process at once; permission and is_active changes of a
+# cached user apply after the TTL.
+FORUMAPP_TOKEN_CACHE_TTL = 300
+FORUMAPP_TOKEN_CACHE_SIZE = 10000
+
+# Rendered response rows and thread list pages are cached as template
+# fragments keyed by the thread/forum ContentVersion, so replies, edits,
+# deletes, votes and pins switch to fresh keys; stale fragments expire
+# after the TTL.
+FORUMAPP_FRAGMENT_CACHE_TTL = 600
+
+# GET responses of the public REST endpoints are cached for anonymous
+# clients under generation counters kept in the cache and bumped with every
+# ContentVersion. Processes only see each other's bumps through a shared
+# cache backend (check forumapp.W001 warns about the default local-memory
+# one outside DEBUG), e.g.
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+#         'LOCATION': '127.0.0.1:11211',
+#     }
+# }
+FORUMAPP_RESPONSE_CACHE_TTL = 300
+
+# TimingMiddleware keeps the last FORUMAPP_TIMING_SAMPLES requests of every
+# endpoint in memory, per process, for the rest/timings/ percentiles.
+FORUMAPP_TIMING_SAMPLES = 1000
+
+# threads_bulk/responses_bulk accept at most FORUMAPP_BULK_MAX_IDS ids and
+# query them in chunks that stay below SQLite's 999 bound variables.
+FORUMAPP_BULK_MAX_IDS = 1000
+FORUMAPP_BULK_CHUNK_SIZE = 500
+
+# Replies move their thread's last_activity with a single-column UPDATE.
+# With write-behind the bumps are buffered per process and flushed every
+# FORUMAPP_ACTIVITY_FLUSH_MS, so listings may lag by up to one interval
+# and bumps still buffered when a process is killed are lost.
+FORUMAPP_ACTIVITY_WRITE_BEHIND = False
+FORUMAPP_ACTIVITY_FLUSH_MS = 500
+
+# Votes can be buffered per process as well and flushed in bulk every
+# FORUMAPP_VOTE_FLUSH_MS. The voter's own vote and the counters served by
+# that process include buffered votes; other processes see them after the
+# flush. Both buffers are drained when the interpreter exits normally,
+# also when the flush interval is not positive and no flusher thread runs.
+FORUMAPP_VOTE_WRITE_BEHIND = False
+FORUMAPP_VOTE_FLUSH_MS = 500
+
+# Upper bound on the sub-requests of one rest/batch/ call.
+FORUMAPP_BATCH_MAX_REQUESTS = 25
@@ -0,0 +1 @@
+default_app_config = 'forumapp.apps.ForumappConfig'
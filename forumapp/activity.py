@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.utils import timezone
+
+from forumapp.models import Thread, ContentVersion
+from forumapp.writebehind import WriteBehindBuffer
+
+
+class ActivityBuffer(WriteBehindBuffer):
+    """
+    Pending last_activity bumps, thread id -> (forum id, latest activity).
+    """
+
+    def merge(self, old, new):
+        return max(old, new, key=lambda value: value[1])
+
+    def write(self, entries):
+        keys = []
+        for thread_id, (forum_id, when) in entries.items():
+            if Thread.bump_activity(thread_id, forum_id, when):
+                keys += [
+                    ContentVersion.thread_key(thread_id),
+                    ContentVersion.forum_key(forum_id)
+                ]
+
+        # listings fetched since the reply were cached with the old order
+        ContentVersion.bump(*keys)
+
+
+activity_buffer = ActivityBuffer(
+    interval=settings.FORUMAPP_ACTIVITY_FLUSH_MS / 1000
+)
+
+
+def record_reply(thread, when=None):
+    """
+    Moves the thread's last_activity to `when`, now by default.
+
+    With FORUMAPP_ACTIVITY_WRITE_BEHIND the bump is buffered and a burst of
+    replies to one thread is written once per flush interval.
+    """
+    when = when or timezone.now()
+    if settings.FORUMAPP_ACTIVITY_WRITE_BEHIND:
+        activity_buffer.add(thread.pk, (thread.forum_id, when))
+    else:
+        Thread.bump_activity(thread.pk, thread.forum_id, when)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ForumappConfig(AppConfig):
     name = 'forumapp'
+
+    def ready(self):
+        from forumapp import checks, signals  # noqa: F401
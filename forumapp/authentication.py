@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import authentication, exceptions
+
+from forumapp.caching import TTLCache
+from forumapp.models import ForumUser
+
+# token key -> (user, token)
+token_cache = TTLCache(
+    maxsize=settings.FORUMAPP_TOKEN_CACHE_SIZE,
+    ttl=settings.FORUMAPP_TOKEN_CACHE_TTL
+)
+
+
+def forget_token(key):
+    """
+    Evicts a revoked token so that it stops authenticating at once.
+    """
+    token_cache.pop(key)
+
+
+def resolve_forum_user(user):
+    """
+    ForumUser of an auth user; free when the reverse one-to-one was
+    already joined in with select_related('user__forumuser').
+    """
+    try:
+        return user.forumuser
+    except ForumUser.DoesNotExist:
+        return None
+
+
+def get_forum_user(request):
+    """
+    ForumUser behind a request, resolved lazily on first use and shared by
+    permissions and views, so requests that never need it skip the lookup.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return None
+
+    if not hasattr(request, 'forum_user'):
+        request.forum_user = resolve_forum_user(user)
+
+    return request.forum_user
+
+
+class ForumTokenAuthentication(authentication.TokenAuthentication):
+    """
+    Joins the ForumUser into the token lookup, so that resolving it later
+    in the request is free.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related(
+                'user__forumuser'
+            ).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return token.user, token
+
+
+class CachingTokenAuthentication(ForumTokenAuthentication):
+    """
+    Keeps token -> user in a bounded in-process LRU, so a warm token
+    authenticates without touching the database.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            credentials = super(
+                CachingTokenAuthentication,
+                self
+            ).authenticate_credentials(key)
+            token_cache.set(key, credentials)
+
+        return credentials
@@ -0,0 +1,113 @@
+import json
+import logging
+from urllib.parse import urlsplit
+
+from django.http import HttpRequest, QueryDict, Http404
+from django.urls import resolve, reverse
+
+from forumapp.authentication import get_forum_user
+
+logger = logging.getLogger(__name__)
+
+# headers of the batch request that must not leak into its parts
+_DROPPED_META_PREFIXES = ('HTTP_IF_', 'CONTENT_')
+
+
+class BatchError(ValueError):
+    pass
+
+
+def api_prefix():
+    return reverse('api-root')
+
+
+def sub_request(request, path):
+    """
+    GET request for `path` sharing the authentication of `request`.
+
+    The user and token the batch was authenticated with are forced onto
+    the sub-request, so its authentication classes never run again.
+
+    :param request: the DRF request of the batch
+    :param path: absolute path with an optional query string
+    """
+    url = urlsplit(path)
+    outer = request._request
+
+    inner = HttpRequest()
+    inner.method = 'GET'
+    inner.path = inner.path_info = url.path
+    inner.META = {
+        key: value for key, value in outer.META.items()
+        if not key.startswith(_DROPPED_META_PREFIXES)
+    }
+    inner.META.update({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+    })
+    inner.GET = QueryDict(url.query)
+    inner.COOKIES = outer.COOKIES
+    for attribute in ('session', 'user'):
+        if hasattr(outer, attribute):
+            setattr(inner, attribute, getattr(outer, attribute))
+
+    if request.user.is_authenticated:
+        inner._force_auth_user = request.user
+        inner._force_auth_token = request.auth
+        inner.forum_user = get_forum_user(request)
+
+    return inner
+
+
+def resolve_api_path(path, excluded=()):
+    """
+    :return ResolverMatch of a path under the REST api
+    :raises BatchError if the path is not a batchable api route
+    """
+    url_path = urlsplit(path).path
+    if not url_path.startswith(api_prefix()):
+        raise BatchError('%s is not an api path.' % path)
+
+    try:
+        match = resolve(url_path)
+    except Http404:
+        raise BatchError('%s does not exist.' % path)
+
+    if match.url_name in excluded:
+        raise BatchError('%s cannot be batched.' % path)
+
+    return match
+
+
+def run(request, match, path):
+    """
+    Executes one part of a batch.
+
+    :return dict with the status code and decoded body of the response
+    """
+    inner = sub_request(request, path)
+    try:
+        response = match.func(inner, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    except Http404:
+        return {'path': path, 'status': 404, 'body': None}
+    except Exception:
+        # a failing part must not fail the other parts of the batch
+        logger.exception('Batched request for %s failed', path)
+        return {'path': path, 'status': 500, 'body': None}
+
+    if response.streaming:
+        return {
+            'path': path,
+            'status': 400,
+            'body': {'path': ['Streaming responses cannot be batched.']}
+        }
+
+    body = response.content.decode(response.charset) or None
+    if body and response.get('Content-Type', '').startswith(
+            'application/json'):
+        body = json.loads(body)
+
+    return {'path': path, 'status': response.status_code, 'body': body}
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The response cache generations have to be seen by every worker; with a
+    per-process cache, bumps made by one worker never reach the others.
+    The development server runs a single process.
+    """
+    if settings.DEBUG or \
+            settings.CACHES['default']['BACKEND'] != PROCESS_LOCAL_CACHE:
+        return []
+
+    return [Warning(
+        'The default cache is local to each process, so anonymous api '
+        'responses cached by one worker stay stale after writes handled '
+        'by another one, for up to FORUMAPP_RESPONSE_CACHE_TTL seconds.',
+        hint='Configure a shared default cache such as Memcached or Redis '
+             'when running more than one worker process.',
+        id='forumapp.W001',
+    )]
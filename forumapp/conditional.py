@@ -0,0 +1,61 @@
+import calendar
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from forumapp.models import ContentVersion
+
+
+def conditional_on(version_key):
+    """
+    Answers GET/HEAD requests with 304 Not Modified when the client's
+    If-None-Match/If-Modified-Since match the current version of the
+    resource, after a single primary key lookup and without running the
+    view.
+    :param version_key callable mapping the view kwargs to a
+    ContentVersion key
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            key = version_key(**kwargs)
+            # read before the view loads rows: a concurrent change can
+            # only make the validators older than the body, never newer
+            version, modified = ContentVersion.lookup(key)
+            etag = '"%s-%d"' % (key.replace(':', '-'), version)
+            last_modified = None
+            if modified is not None:
+                last_modified = calendar.timegm(modified.utctimetuple())
+
+            response = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=last_modified
+            )
+            if response is not None:
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def thread_version(pk, **kwargs):
+    return ContentVersion.thread_key(pk)
+
+
+def forum_version(pk, **kwargs):
+    return ContentVersion.forum_key(pk)
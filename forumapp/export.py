@@ -0,0 +1,78 @@
+from django.core.serializers.json import DjangoJSONEncoder
+
+from forumapp.models import Forum, ForumUser, Thread, ThreadResponse
+
+NDJSON = 'ndjson'
+JSON = 'json'
+OUTPUTS = (NDJSON, JSON)
+
+CONTENT_TYPES = {
+    NDJSON: 'application/x-ndjson',
+    JSON: 'application/json',
+}
+
+CHUNK_SIZE = 2000
+
+THREAD_FIELDS = (
+    'id', 'forum', 'creator', 'created_datetime', 'name', 'message'
+)
+RESPONSE_FIELDS = (
+    'id', 'thread', 'thread__forum', 'creator', 'created_datetime',
+    'edited', 'message'
+)
+
+# scope -> (model of the exported object, filter on threads, on responses)
+SCOPES = {
+    'thread': (Thread, 'id', 'thread'),
+    'forum': (Forum, 'forum', 'thread__forum'),
+    'user': (ForumUser, 'creator', 'creator'),
+}
+
+
+def exists(scope, pk):
+    return SCOPES[scope][0].objects.filter(pk=pk).exists()
+
+
+def posts(scope, pk, chunk_size=CHUNK_SIZE):
+    """
+    Threads and then responses within `scope`, read `chunk_size` rows at
+    a time through a database cursor instead of being loaded at once.
+
+    :param scope: one of SCOPES
+    :param pk: id of the thread, forum or forum user
+    :return generator of dicts
+    """
+    _, thread_filter, response_filter = SCOPES[scope]
+
+    threads = Thread.objects.filter(**{thread_filter: pk}).order_by('id')
+    for row in threads.values(*THREAD_FIELDS).iterator(chunk_size):
+        row['kind'] = 'thread'
+        yield row
+
+    responses = ThreadResponse.objects.filter(
+        **{response_filter: pk}
+    ).order_by('thread', 'created_datetime', 'id')
+    for row in responses.values(*RESPONSE_FIELDS).iterator(chunk_size):
+        row['kind'] = 'response'
+        row['forum'] = row.pop('thread__forum')
+        yield row
+
+
+def encode(rows, output=NDJSON):
+    """
+    Encodes rows one at a time, as JSON lines or as a single JSON array.
+
+    :return generator of str
+    """
+    dumps = DjangoJSONEncoder().encode
+    if output == NDJSON:
+        for row in rows:
+            yield dumps(row) + '\n'
+        return
+
+    separator = '[\n'
+    for row in rows:
+        yield separator + dumps(row)
+        separator = ',\n'
+
+    yield '[]\n' if separator == '[\n' else '\n]\n'
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from forumapp import export
+
+
+class Command(BaseCommand):
+    help = 'Streams every post of a thread, forum or forum user as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scope', choices=sorted(export.SCOPES))
+        parser.add_argument('pk', type=int)
+        parser.add_argument(
+            '--output',
+            choices=export.OUTPUTS,
+            default=export.NDJSON,
+            help='One JSON object per line, or a single JSON array.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=export.CHUNK_SIZE,
+            help='Number of rows fetched from the database at a time.'
+        )
+
+    def handle(self, *args, **options):
+        scope, pk = options['scope'], options['pk']
+        if not export.exists(scope, pk):
+            raise CommandError('%s %d does not exist.' % (scope.title(), pk))
+
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        rows = export.posts(scope, pk, options['chunk_size'])
+        for chunk in export.encode(rows, options['output']):
+            self.stdout.write(chunk, ending='')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from forumapp import search
+
+
+class Command(BaseCommand):
+    help = 'Re-indexes all threads and responses for full-text search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows indexed per statement.'
+        )
+
+    def handle(self, *args, **options):
+        if not search.search_available():
+            raise CommandError('Search requires SQLite with FTS5.')
+
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        indexed = search.rebuild(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS('Indexed %d threads and responses.' % indexed)
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from forumapp.models import SiteStatistics
+
+
+class Command(BaseCommand):
+    help = 'Recounts the site statistics shown on the index page.'
+
+    def handle(self, *args, **options):
+        statistics = SiteStatistics.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            'Users: %d, threads: %d, responses: %d' % (
+                statistics.users,
+                statistics.threads,
+                statistics.responses
+            )
+        ))
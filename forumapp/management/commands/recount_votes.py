@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from forumapp.models import ThreadResponse
+from forumapp.votes import recount_votes
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the like/dislike counters of responses from votes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--thread',
+            type=int,
+            help='Only recount the responses of the given thread.'
+        )
+
+    def handle(self, *args, **options):
+        responses = ThreadResponse.objects.all()
+        if options['thread'] is not None:
+            responses = responses.filter(thread=options['thread'])
+
+        updated = recount_votes(responses)
+        self.stdout.write(
+            self.style.SUCCESS('Recounted votes of %d responses.' % updated)
+        )
@@ -0,0 +1,98 @@
+# Generated by Django 2.0.1 on 2026-10-18 07:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Forum',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True)),
+                ('description', models.TextField(max_length=200)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ForumSection',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ForumUser',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('banned_until', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'permissions': [('can_ban_users', 'Can ban any user.')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LikeDislike',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('like', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Thread',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('pinned', models.BooleanField(default=False)),
+                ('message', models.TextField(max_length=1000)),
+                ('created_datetime', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_activity', models.DateTimeField(default=django.utils.timezone.now)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='forumapp.ForumUser')),
+                ('forum', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='forumapp.Forum')),
+            ],
+            options={
+                'ordering': ['-last_activity', 'pinned'],
+                'permissions': [('can_remove_any_thread', 'Can remove ANY thread.'), ('can_pin_threads', 'Can pin threads.')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ThreadResponse',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_datetime', models.DateTimeField(default=django.utils.timezone.now)),
+                ('message', models.TextField(max_length=1000)),
+                ('edited', models.BooleanField(default=False)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='forumapp.ForumUser')),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='forumapp.Thread')),
+            ],
+            options={
+                'ordering': ['created_datetime'],
+                'permissions': [('can_remove_any_response', 'Can remove ANY response.')],
+            },
+        ),
+        migrations.AddField(
+            model_name='likedislike',
+            name='response',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='forumapp.ThreadResponse'),
+        ),
+        migrations.AddField(
+            model_name='likedislike',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='forumapp.ForumUser'),
+        ),
+        migrations.AddField(
+            model_name='forum',
+            name='section',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='forumapp.ForumSection'),
+        ),
+    ]
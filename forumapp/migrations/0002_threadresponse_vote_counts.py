@@ -0,0 +1,47 @@
+# Generated by Django 2.0.1 on 2026-10-18 07:09
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_vote_counts(apps, schema_editor):
+    ThreadResponse = apps.get_model('forumapp', 'ThreadResponse')
+    LikeDislike = apps.get_model('forumapp', 'LikeDislike')
+
+    def votes(like):
+        return Coalesce(Subquery(
+            LikeDislike.objects.filter(
+                response=OuterRef('pk'),
+                like=like
+            ).order_by().values('response').annotate(
+                count=Count('pk')
+            ).values('count'),
+            output_field=IntegerField()
+        ), 0)
+
+    ThreadResponse.objects.update(likes=votes(True), dislikes=votes(False))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forumapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threadresponse',
+            name='dislikes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='threadresponse',
+            name='likes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(
+            populate_vote_counts,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 2.0.1 on 2026-10-18 07:12
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_votes(apps, schema_editor):
+    """
+    Keeps the oldest vote of every (user, response) pair so that the unique
+    constraint can be created, then fixes the counters of affected responses.
+    """
+    ThreadResponse = apps.get_model('forumapp', 'ThreadResponse')
+    LikeDislike = apps.get_model('forumapp', 'LikeDislike')
+
+    duplicates = LikeDislike.objects.values('user', 'response').annotate(
+        first=Min('id'),
+        count=Count('id')
+    ).filter(count__gt=1)
+
+    affected = set()
+    for duplicate in duplicates:
+        LikeDislike.objects.filter(
+            user=duplicate['user'],
+            response=duplicate['response']
+        ).exclude(id=duplicate['first']).delete()
+        affected.add(duplicate['response'])
+
+    def votes(like):
+        return Coalesce(Subquery(
+            LikeDislike.objects.filter(
+                response=OuterRef('pk'),
+                like=like
+            ).order_by().values('response').annotate(
+                count=Count('pk')
+            ).values('count'),
+            output_field=IntegerField()
+        ), 0)
+
+    if affected:
+        ThreadResponse.objects.filter(id__in=affected).update(
+            likes=votes(True),
+            dislikes=votes(False)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forumapp', '0002_threadresponse_vote_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_votes,
+            migrations.RunPython.noop
+        ),
+        migrations.AlterUniqueTogether(
+            name='likedislike',
+            unique_together={('user', 'response')},
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['forum', 'pinned', 'last_activity'], name='thread_forum_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threadresponse',
+            index=models.Index(fields=['thread', 'created_datetime'], name='response_thread_created_idx'),
+        ),
+    ]
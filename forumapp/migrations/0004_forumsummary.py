@@ -0,0 +1,43 @@
+# Generated by Django 2.0.1 on 2026-10-18 07:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_forum_summaries(apps, schema_editor):
+    Forum = apps.get_model('forumapp', 'Forum')
+    ForumSummary = apps.get_model('forumapp', 'ForumSummary')
+    Thread = apps.get_model('forumapp', 'Thread')
+
+    for forum_id in Forum.objects.values_list('id', flat=True):
+        latest = Thread.objects.filter(forum=forum_id).order_by(
+            '-last_activity', '-id'
+        ).values('id', 'last_activity').first() or {}
+
+        ForumSummary.objects.create(
+            forum_id=forum_id,
+            latest_thread_id=latest.get('id'),
+            latest_activity=latest.get('last_activity')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forumapp', '0003_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForumSummary',
+            fields=[
+                ('forum', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='forumapp.Forum')),
+                ('latest_activity', models.DateTimeField(null=True)),
+                ('latest_thread', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='forumapp.Thread')),
+            ],
+        ),
+        migrations.RunPython(
+            populate_forum_summaries,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.0.1 on 2026-10-18 07:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_site_statistics(apps, schema_editor):
+    SiteStatistics = apps.get_model('forumapp', 'SiteStatistics')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Thread = apps.get_model('forumapp', 'Thread')
+    ThreadResponse = apps.get_model('forumapp', 'ThreadResponse')
+
+    SiteStatistics.objects.create(
+        id=1,
+        users=User.objects.count(),
+        threads=Thread.objects.count(),
+        responses=ThreadResponse.objects.count()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('forumapp', '0004_forumsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('users', models.PositiveIntegerField(default=0)),
+                ('threads', models.PositiveIntegerField(default=0)),
+                ('responses', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(
+            populate_site_statistics,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import DatabaseError, migrations, transaction
+
+
+def has_fts5(schema_editor):
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE temp.forumapp_fts5_probe '
+                'USING fts5(text)'
+            )
+    except DatabaseError:
+        return False
+
+    schema_editor.execute('DROP TABLE temp.forumapp_fts5_probe')
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only, and optional there; without it the site simply
+    # goes without search
+    if schema_editor.connection.vendor != 'sqlite' or \
+            not has_fts5(schema_editor):
+        return
+
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE forumapp_search USING fts5('
+        'name, message, kind UNINDEXED, object_id UNINDEXED, '
+        'thread_id UNINDEXED, forum_id UNINDEXED)'
+    )
+    # matches in thread names count ten times as much as in messages
+    schema_editor.execute(
+        "INSERT INTO forumapp_search (forumapp_search, rank) "
+        "VALUES ('rank', 'bm25(10.0, 1.0)')"
+    )
+    schema_editor.execute(
+        'INSERT INTO forumapp_search '
+        '(rowid, name, message, kind, object_id, thread_id, forum_id) '
+        "SELECT id * 2, name, message, 'thread', id, id, forum_id "
+        'FROM forumapp_thread'
+    )
+    schema_editor.execute(
+        'INSERT INTO forumapp_search '
+        '(rowid, name, message, kind, object_id, thread_id, forum_id) '
+        "SELECT r.id * 2 + 1, '', r.message, 'response', r.id, r.thread_id, "
+        't.forum_id FROM forumapp_threadresponse r '
+        'JOIN forumapp_thread t ON t.id = r.thread_id'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS forumapp_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forumapp', '0006_contentversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
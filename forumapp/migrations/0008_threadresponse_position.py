@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+
+
+def number_responses(apps, schema_editor):
+    """
+    Numbers the existing responses of each thread by creation order, in
+    one UPDATE.
+    """
+    ThreadResponse = apps.get_model('forumapp', 'ThreadResponse')
+    earlier = ThreadResponse.objects.filter(
+        Q(created_datetime__lt=OuterRef('created_datetime')) |
+        Q(
+            created_datetime=OuterRef('created_datetime'),
+            id__lte=OuterRef('id')
+        ),
+        thread=OuterRef('thread')
+    ).order_by().values('thread').annotate(count=Count('pk')).values('count')
+
+    ThreadResponse.objects.update(
+        position=Subquery(earlier, output_field=IntegerField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forumapp', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threadresponse',
+            name='position',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(number_responses, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='threadresponse',
+            name='position',
+            field=models.PositiveIntegerField(editable=False),
+        ),
+        migrations.AlterUniqueTogether(
+            name='threadresponse',
+            unique_together={('thread', 'position')},
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.0.1 on 2026-10-18 07:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forumapp', '0009_vote_counter_triggers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['creator', 'created_datetime'], name='thread_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='threadresponse',
+            index=models.Index(fields=['creator', 'created_datetime'], name='response_creator_created_idx'),
+        ),
+    ]
@@ -1,8 +1,13 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q, Count, IntegerField, OuterRef, Subquery
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
 
 from django.utils import timezone
 
+from forumapp.responsecache import bump_generations
+
 
 class ForumUser(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -21,6 +26,42 @@ class ForumSection(models.Model):
         return self.name
 
 
+def _count_subquery(queryset, field):
+    """
+    Correlated COUNT over `queryset` grouped by `field`, so that only the
+    rows actually returned by the outer query are counted.
+    """
+    counts = queryset.order_by().values(field).annotate(
+        count=Count('pk')
+    ).values('count')
+
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class ForumQuerySet(models.QuerySet):
+    def with_counts(self):
+        return self.annotate(
+            thread_count=_count_subquery(
+                Thread.objects.filter(forum=OuterRef('pk')),
+                'forum'
+            ),
+            last_activity=F('summary__latest_activity')
+        )
+
+    def overview(self):
+        """
+        Everything the forums page shows about a forum, in one query.
+        """
+        return self.with_counts().annotate(
+            response_count=_count_subquery(
+                ThreadResponse.objects.filter(thread__forum=OuterRef('pk')),
+                'thread__forum'
+            ),
+            latest_thread_id=F('summary__latest_thread'),
+            latest_thread_name=F('summary__latest_thread__name')
+        )
+
+
 class Forum(models.Model):
     name = models.CharField(max_length=30, unique=True)
     description = models.TextField(max_length=200)
@@ -29,10 +70,41 @@ class Forum(models.Model):
         on_delete=models.CASCADE
     )
 
+    objects = ForumQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
 
+class ThreadQuerySet(models.QuerySet):
+    def with_counts(self):
+        return self.annotate(response_count=_count_subquery(
+            ThreadResponse.objects.filter(thread=OuterRef('pk')),
+            'thread'
+        ))
+
+    def listing(self):
+        """
+        Everything a forum's thread list shows about a thread, including
+        its latest response, in one query.
+        """
+        latest = ThreadResponse.objects.filter(
+            thread=OuterRef('pk')
+        ).order_by('-created_datetime', '-id')
+
+        def latest_response(field):
+            return Subquery(latest.values(field)[:1])
+
+        return self.select_related('creator__user').with_counts().annotate(
+            latest_response_position=latest_response('position'),
+            latest_response_message=latest_response('message'),
+            latest_response_creator_id=latest_response('creator'),
+            latest_response_creator_name=latest_response(
+                'creator__user__username'
+            )
+        )
+
+
 class Thread(models.Model):
     name = models.CharField(max_length=100)
     forum = models.ForeignKey(
@@ -44,9 +116,31 @@ class Thread(models.Model):
     created_datetime = models.DateTimeField(default=timezone.now)
     last_activity = models.DateTimeField(default=timezone.now)
 
+    objects = ThreadQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def bump_activity(cls, thread_id, forum_id, when):
+        """
+        Moves last_activity forward to `when` with a single-column UPDATE
+        that leaves a more recent value alone, then updates the forum
+        summary, which the skipped post_save would otherwise have done.
+
+        :return bool whether the thread was updated
+        """
+        updated = cls.objects.filter(
+            pk=thread_id,
+            last_activity__lt=when
+        ).update(last_activity=when)
+        if updated:
+            ForumSummary.record_activity(
+                cls(pk=thread_id, forum_id=forum_id, last_activity=when)
+            )
+
+        return bool(updated)
+
     class Meta:
         permissions = [
             ('can_remove_any_thread', 'Can remove ANY thread.'),
@@ -56,6 +150,81 @@ class Thread(models.Model):
             '-last_activity',
             'pinned'
         ]
+        indexes = [
+            # forum listing: filter on forum, order by pinned, last_activity
+            models.Index(
+                fields=['forum', 'pinned', 'last_activity'],
+                name='thread_forum_activity_idx'
+            ),
+            # profile: a user's threads, most recent first
+            models.Index(
+                fields=['creator', 'created_datetime'],
+                name='thread_creator_created_idx'
+            ),
+        ]
+
+
+class ForumSummary(models.Model):
+    """
+    Per-forum summary maintained on thread activity, so that the latest
+    thread of every forum is read without aggregating over all threads.
+    """
+    forum = models.OneToOneField(
+        Forum,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary'
+    )
+    latest_thread = models.ForeignKey(
+        Thread,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
+    latest_activity = models.DateTimeField(null=True)
+
+    @classmethod
+    def record_activity(cls, thread):
+        """
+        Makes `thread` the latest one of its forum unless a more recently
+        active thread is already recorded.
+        """
+        updated = cls.objects.filter(
+            Q(latest_activity__isnull=True) |
+            Q(latest_activity__lte=thread.last_activity),
+            forum_id=thread.forum_id
+        ).update(
+            latest_thread=thread.pk,
+            latest_activity=thread.last_activity
+        )
+        if not updated:
+            cls.objects.get_or_create(
+                forum_id=thread.forum_id,
+                defaults={
+                    'latest_thread_id': thread.pk,
+                    'latest_activity': thread.last_activity
+                }
+            )
+
+    @classmethod
+    def refresh(cls, forum_id):
+        """
+        Recomputes the latest thread of a forum, e.g. after it was deleted.
+        """
+        latest = Thread.objects.filter(forum=forum_id).order_by(
+            '-last_activity', '-id'
+        ).values('id', 'last_activity').first() or {}
+
+        cls.objects.filter(forum_id=forum_id).update(
+            latest_thread=latest.get('id'),
+            latest_activity=latest.get('last_activity')
+        )
+
+
+NEXT_POSITION_SQL = (
+    'SELECT COALESCE(MAX(position), 0) + 1 FROM forumapp_threadresponse '
+    'WHERE thread_id = %s'
+)
 
 
 class ThreadResponse(models.Model):
@@ -64,16 +233,62 @@ class ThreadResponse(models.Model):
     creator = models.ForeignKey(ForumUser, on_delete=models.CASCADE)
     message = models.TextField(max_length=1000, null=False)
     edited = models.BooleanField(default=False)
+    likes = models.PositiveIntegerField(default=0)
+    dislikes = models.PositiveIntegerField(default=0)
+    # 1-based number of the response within its thread, allocated on insert
+    # and never reused, so deleted responses leave gaps
+    position = models.PositiveIntegerField(editable=False)
 
-    # order_in_thread = models.PositiveIntegerField(default=1)
+    POSITION_ATTEMPTS = 5
 
     class Meta:
         permissions = [('can_remove_any_response', 'Can remove ANY response.')]
         ordering = ['created_datetime']
+        unique_together = ('thread', 'position')
+        indexes = [
+            models.Index(
+                fields=['thread', 'created_datetime'],
+                name='response_thread_created_idx'
+            ),
+            models.Index(
+                fields=['creator', 'created_datetime'],
+                name='response_creator_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.message
 
+    def save(self, *args, **kwargs):
+        if self.position is not None:
+            return super(ThreadResponse, self).save(*args, **kwargs)
+
+        # the INSERT reads the MAX itself, so SQLite holds the write lock
+        # while it does; databases where concurrent inserts can still read
+        # the same MAX reject all but one of them through the unique
+        # constraint, and the others try again
+        for attempt in range(self.POSITION_ATTEMPTS):
+            self.position = RawSQL(NEXT_POSITION_SQL, (self.thread_id,))
+            try:
+                with transaction.atomic():
+                    super(ThreadResponse, self).save(*args, **kwargs)
+                break
+            except IntegrityError:
+                if attempt == self.POSITION_ATTEMPTS - 1:
+                    raise
+            finally:
+                # the expression is no value to keep on the instance
+                self.position = None
+
+        self.position = ThreadResponse.objects.values_list(
+            'position',
+            flat=True
+        ).get(pk=self.pk)
+
+    @property
+    def score(self):
+        return self.likes - self.dislikes
+
 
 class LikeDislike(models.Model):
     """
@@ -89,3 +304,101 @@ class LikeDislike(models.Model):
         ThreadResponse,
         on_delete=models.CASCADE
     )
+
+    class Meta:
+        unique_together = ('user', 'response')
+
+
+class SiteStatistics(models.Model):
+    """
+    Single row of site wide counters kept up to date by signal handlers,
+    so that the index page does not count whole tables on every hit.
+    """
+    users = models.PositiveIntegerField(default=0)
+    threads = models.PositiveIntegerField(default=0)
+    responses = models.PositiveIntegerField(default=0)
+
+    SINGLETON_ID = 1
+
+    @classmethod
+    def get(cls):
+        try:
+            return cls.objects.get(pk=cls.SINGLETON_ID)
+        except cls.DoesNotExist:
+            return cls.reconcile()
+
+    @classmethod
+    def adjust(cls, **deltas):
+        """
+        Shifts the counters by the given deltas, e.g. adjust(threads=1).
+        """
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(**{
+            name: F(name) + delta for name, delta in deltas.items()
+        })
+        if not updated:
+            cls.reconcile()
+
+    @classmethod
+    def reconcile(cls):
+        """
+        Recounts every counter from its table, fixing any drift.
+        """
+        statistics, _ = cls.objects.update_or_create(
+            pk=cls.SINGLETON_ID,
+            defaults={
+                'users': User.objects.count(),
+                'threads': Thread.objects.count(),
+                'responses': ThreadResponse.objects.count(),
+            }
+        )
+        return statistics
+
+
+class ContentVersion(models.Model):
+    """
+    Version counter of a cacheable resource such as a thread or a forum,
+    bumped whenever anything shown by that resource changes.
+    """
+    key = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    @staticmethod
+    def thread_key(thread_id):
+        return 'thread:%s' % thread_id
+
+    @staticmethod
+    def forum_key(forum_id):
+        return 'forum:%s' % forum_id
+
+    @classmethod
+    def lookup(cls, key):
+        """
+        :return tuple (version, modified); (0, None) if never bumped
+        """
+        row = cls.objects.filter(key=key).values_list(
+            'version',
+            'modified'
+        ).first()
+        return row or (0, None)
+
+    @classmethod
+    def bump(cls, *keys):
+        """
+        Increments the version of every key, and moves the keys to a new
+        generation in the response cache.
+        """
+        bump_generations(*keys)
+        now = timezone.now()
+        for key in keys:
+            updated = cls.objects.filter(key=key).update(
+                version=F('version') + 1,
+                modified=now
+            )
+            if not updated:
+                _, created = cls.objects.get_or_create(
+                    key=key,
+                    defaults={'version': 1, 'modified': now}
+                )
+                if not created:
+                    cls.bump(key)
@@ -0,0 +1,208 @@
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(payload):
+    """
+    Opaque url-safe token of a JSON-serializable cursor payload.
+    """
+    return base64.urlsafe_b64encode(
+        json.dumps(payload).encode()
+    ).decode('ascii')
+
+
+def decode_cursor(encoded):
+    """
+    Inverse of encode_cursor; raises ValueError on tampered tokens.
+    """
+    try:
+        return json.loads(
+            base64.urlsafe_b64decode(encoded.encode('ascii')).decode()
+        )
+    except (UnicodeError, binascii.Error) as error:
+        raise ValueError(error)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination seeking on the whole `ordering` key.
+
+    The cursor holds the key of the boundary row, so every page is fetched
+    with the same index range scan no matter how deep it is. `ordering`
+    has to end with a unique field to make the key total.
+    """
+    ordering = ('id',)
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # absolute url the links point to; the requested url by default
+    url = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.model = queryset.model
+        return self._paginate(queryset, request, self.decode_cursor(request))
+
+    def first_page(self, queryset, request, url):
+        """
+        First page of `queryset` embedded in another response, linking to
+        the endpoint at `url` for the following pages.
+        """
+        self.model = queryset.model
+        self.url = url
+        return self._paginate(queryset, request, None)
+
+    def _paginate(self, queryset, request, cursor):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        reverse = cursor is not None and cursor[0]
+        ordering = self.ordering
+        if reverse:
+            ordering = [self._invert(field) for field in ordering]
+
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self._seek(ordering, cursor[1]))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        return self._link(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        return self._link(True, self.page[0])
+
+    def decode_cursor(self, request):
+        """
+        :return tuple (reverse, key values) or None for the first page
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            reverse, values = decode_cursor(encoded)
+            if len(values) != len(self.ordering):
+                raise ValueError
+            values = [
+                self.model._meta.get_field(self._name(field)).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+            if None in values:
+                raise ValueError
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return bool(reverse), values
+
+    def encode_cursor(self, reverse, values):
+        values = [
+            value.isoformat() if isinstance(value, datetime.datetime)
+            else value for value in values
+        ]
+        return encode_cursor([reverse, values])
+
+    def position(self, row):
+        names = [self._name(field) for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+
+        return [getattr(row, name) for name in names]
+
+    def _link(self, reverse, row):
+        url = self.url or self.request.build_absolute_uri()
+        cursor = self.encode_cursor(reverse, self.position(row))
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def _seek(self, ordering, values):
+        """
+        Builds the lexicographic "comes after `values`" filter, e.g.
+        a >= x AND (a > x OR (a = x AND b > y)) for the ordering (a, b).
+        The redundant bound on the first field is what lets the database
+        start the index range scan at the cursor instead of scanning from
+        the start of the range.
+        """
+        lookup = '__lte' if ordering[0].startswith('-') else '__gte'
+        bound = Q(**{self._name(ordering[0]) + lookup: values[0]})
+        conditions = []
+        for i, field in enumerate(ordering):
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            condition = Q(**{self._name(field) + lookup: values[i]})
+            for previous, value in zip(ordering[:i], values):
+                condition &= Q(**{self._name(previous): value})
+            conditions.append(condition)
+
+        return bound & reduce(or_, conditions)
+
+    @staticmethod
+    def _name(field):
+        return field.lstrip('-')
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+
+class ThreadCursorPagination(KeysetPagination):
+    ordering = ('-pinned', '-last_activity', '-id')
+
+
+class ResponseCursorPagination(KeysetPagination):
+    ordering = ('created_datetime', 'id')
+
+
+class UserActivityCursorPagination(KeysetPagination):
+    """
+    Most recent first, for the threads and responses of a profile.
+    """
+    ordering = ('-created_datetime', '-id')
+    page_size = 10
@@ -1,19 +1,53 @@
 import datetime
+
+from django.conf import settings
 from rest_framework import permissions
 
+from forumapp.authentication import get_forum_user
+from forumapp.caching import TTLCache
 from forumapp.models import ForumUser
 
+# user id -> banned_until
+ban_cache = TTLCache(
+    maxsize=settings.FORUMAPP_BAN_CACHE_SIZE,
+    ttl=settings.FORUMAPP_BAN_CACHE_TTL
+)
+
+
+def banned_until(user):
+    """
+    Ban expiry of an auth user, served from `ban_cache` when possible.
+    A miss always queries: the ForumUser of a request may come from the
+    token cache, which outlives `ban_cache`.
+    """
+    expiry = ban_cache.get(user.pk)
+    if expiry is None:
+        expiry = ForumUser.objects.values_list(
+            'banned_until',
+            flat=True
+        ).get(user=user)
+        ban_cache.set(user.pk, expiry)
+
+    return expiry
+
+
+def is_banned(user):
+    return banned_until(user).replace(tzinfo=None) > datetime.datetime.now()
+
+
+def forget_ban(user_id):
+    """
+    Must be called whenever banned_until changes so that it applies at once.
+    """
+    ban_cache.pop(user_id)
+
 
 class IsNotBanned(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        forum_user = ForumUser.objects.get(user=request.user)
-
-        return forum_user.banned_until.replace(
-            tzinfo=None
-        ) <= datetime.datetime.now()
+        return not is_banned(request.user)
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -28,8 +62,8 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the owner of the snippet.
-        forum_user = ForumUser.objects.get(user=request.user)
-        return obj.creator == forum_user
+        forum_user = get_forum_user(request)
+        return forum_user is not None and obj.creator_id == forum_user.id
 
 
 class CanPinThreads(permissions.BasePermission):
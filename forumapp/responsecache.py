@@ -0,0 +1,141 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+# generation of everything listed across forums; bumped with every other
+# generation
+ALL_CONTENT = 'all'
+
+# headers replayed from a cached response
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+def _generation_key(key):
+    return 'generation:%s' % key
+
+
+def _initial_generation():
+    # a generation evicted from the cache restarts above every value it
+    # had before, so entries cached under old generations stay unreachable
+    return int(time.time() * 1000)
+
+
+def generations(keys):
+    """
+    :param keys ContentVersion style keys, e.g. 'thread:1'
+    :return list of the current generation of every key
+    """
+    cache_keys = [_generation_key(key) for key in keys]
+    current = cache.get_many(cache_keys)
+    for cache_key in cache_keys:
+        if cache_key not in current:
+            cache.add(cache_key, _initial_generation(), timeout=None)
+            current[cache_key] = cache.get(cache_key)
+
+    return [current[cache_key] for cache_key in cache_keys]
+
+
+def _bump(keys):
+    for key in keys:
+        cache_key = _generation_key(key)
+        try:
+            cache.incr(cache_key)
+        except ValueError:
+            if not cache.add(cache_key, _initial_generation(), timeout=None):
+                cache.incr(cache_key)
+
+
+def bump_generations(*keys):
+    """
+    Moves the given keys and ALL_CONTENT to a new generation, so that
+    responses cached under the old one are no longer served. The bump is
+    repeated on commit: a response cached from the old rows while the
+    transaction was open would be stored under the new generation.
+    """
+    keys = keys + (ALL_CONTENT,)
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def all_content(**kwargs):
+    return ALL_CONTENT
+
+
+def _is_anonymous(request):
+    return 'HTTP_AUTHORIZATION' not in request.META and \
+           not request.user.is_authenticated
+
+
+def cached_for_anonymous(generation_key):
+    """
+    Serves GET requests of anonymous clients from the cache. Responses
+    are stored as rendered bytes under the scheme, host, path, query
+    string, Accept header and the current generation of the resource, so
+    a hit runs neither the ORM nor the serializer.
+    :param generation_key callable mapping the view kwargs to a
+    ContentVersion key, as for conditional_on
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or not _is_anonymous(request):
+                return view(request, *args, **kwargs)
+
+            generation, = generations([generation_key(**kwargs)])
+            # pagination links in the body are absolute urls
+            variant = '%s://%s%s\n%s' % (
+                request.scheme,
+                request.get_host(),
+                request.get_full_path(),
+                request.META.get('HTTP_ACCEPT', '')
+            )
+            digest = hashlib.md5(variant.encode()).hexdigest()
+            key = 'response:%s:%s' % (generation, digest)
+
+            cached = cache.get(key)
+            if cached is not None:
+                content, headers = cached
+                last_modified = headers.get('Last-Modified')
+                response = get_conditional_response(
+                    request,
+                    etag=headers.get('ETag'),
+                    last_modified=last_modified and
+                    parse_http_date_safe(last_modified)
+                )
+                if response is not None:
+                    return response
+
+                response = HttpResponse(content)
+                for header, value in headers.items():
+                    response[header] = value
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+            def store(rendered):
+                cache.set(key, (rendered.content, {
+                    header: rendered[header] for header in CACHED_HEADERS
+                    if rendered.has_header(header)
+                }), settings.FORUMAPP_RESPONSE_CACHE_TTL)
+
+            if hasattr(response, 'add_post_render_callback'):
+                # DRF responses are rendered after the view returns
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+
+            return response
+
+        return wrapper
+
+    return decorator
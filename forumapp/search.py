@@ -0,0 +1,222 @@
+import re
+
+from django.db import DatabaseError, connection, transaction
+from django.utils.html import escape
+
+from forumapp.models import Thread, ThreadResponse
+
+SEARCH_TABLE = 'forumapp_search'
+
+THREAD = 'thread'
+RESPONSE = 'response'
+
+# thread and response ids share the index, interleaved on the rowid
+KINDS = (THREAD, RESPONSE)
+
+MAX_TERMS = 16
+
+# control characters cannot be typed into posts, so they survive escaping
+_MARK_START, _MARK_END = '\x02', '\x03'
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+INSERT_SQL = (
+    'INSERT OR REPLACE INTO {table} '
+    '(rowid, name, message, kind, object_id, thread_id, forum_id) '
+    'VALUES (%s, %s, %s, %s, %s, %s, %s)'
+).format(table=SEARCH_TABLE)
+
+
+def _has_fts5():
+    with connection.cursor() as cursor:
+        try:
+            with transaction.atomic():
+                cursor.execute(
+                    'CREATE VIRTUAL TABLE temp.forumapp_fts5_probe '
+                    'USING fts5(text)'
+                )
+        except DatabaseError:
+            return False
+
+        cursor.execute('DROP TABLE temp.forumapp_fts5_probe')
+        return True
+
+
+def search_available():
+    """
+    The index is an FTS5 virtual table, which needs SQLite built with the
+    FTS5 extension. The probe runs once per database connection.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+
+    connection.ensure_connection()
+    cached = getattr(connection, '_forumapp_fts5', None)
+    if cached is None or cached[0] is not connection.connection:
+        cached = (connection.connection, _has_fts5())
+        connection._forumapp_fts5 = cached
+
+    return cached[1]
+
+
+def rowid(kind, object_id):
+    return object_id * 2 + KINDS.index(kind)
+
+
+def thread_row(thread_id, name, message, forum_id):
+    return (
+        rowid(THREAD, thread_id), name, message, THREAD,
+        thread_id, thread_id, forum_id
+    )
+
+
+def response_row(response_id, message, thread_id, forum_id):
+    return (
+        rowid(RESPONSE, response_id), '', message, RESPONSE,
+        response_id, thread_id, forum_id
+    )
+
+
+def index_thread(thread):
+    if search_available():
+        with connection.cursor() as cursor:
+            cursor.execute(INSERT_SQL, thread_row(
+                thread.pk, thread.name, thread.message, thread.forum_id
+            ))
+
+
+def index_response(response, forum_id):
+    if search_available():
+        with connection.cursor() as cursor:
+            cursor.execute(INSERT_SQL, response_row(
+                response.pk, response.message, response.thread_id, forum_id
+            ))
+
+
+def unindex(kind, object_id):
+    if search_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {} WHERE rowid = %s'.format(SEARCH_TABLE),
+                [rowid(kind, object_id)]
+            )
+
+
+def unindex_thread(thread_id):
+    """
+    Removes a thread and all of its responses in one statement.
+    """
+    if search_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {} WHERE thread_id = %s'.format(SEARCH_TABLE),
+                [thread_id]
+            )
+
+
+def match_expression(query):
+    """
+    Turns free text into an FTS5 query matching all of its words, so that
+    user input can never be parsed as FTS5 syntax.
+
+    :return str or None if the query has no searchable words
+    """
+    terms = _TERM.findall(query)[:MAX_TERMS]
+    if not terms:
+        return None
+
+    return ' '.join('"%s"' % term for term in terms)
+
+
+def highlight(snippet):
+    return escape(snippet).replace(
+        _MARK_START, '<mark>'
+    ).replace(_MARK_END, '</mark>')
+
+
+def search(expression, forum_ids=(), after=None, limit=20):
+    """
+    Best matches first: BM25 with thread names weighted over messages,
+    ties broken on the rowid so that `after` can seek past a page.
+
+    :param expression: match expression from match_expression
+    :param forum_ids: only search within these forums
+    :param after: (rank, rowid) of the last row of the previous page
+    :param limit: number of rows to return
+    :return list of dicts
+    """
+    sql = [
+        'SELECT rowid, rank, kind, object_id, thread_id, forum_id, '
+        "snippet({table}, -1, %s, %s, '...', 16) "
+        'FROM {table} WHERE {table} MATCH %s'
+    ]
+    params = [_MARK_START, _MARK_END, expression]
+
+    if forum_ids:
+        placeholders = ', '.join(['%s'] * len(forum_ids))
+        sql.append('AND forum_id IN (%s)' % placeholders)
+        params.extend(forum_ids)
+
+    if after is not None:
+        sql.append('AND (rank > %s OR (rank = %s AND rowid > %s))')
+        params.extend([after[0], after[0], after[1]])
+
+    sql.append('ORDER BY rank, rowid LIMIT %s')
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql).format(table=SEARCH_TABLE), params)
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'rowid': row[0],
+            'rank': row[1],
+            'kind': row[2],
+            'id': row[3],
+            'thread': row[4],
+            'forum': row[5],
+            'snippet': highlight(row[6]),
+        } for row in rows
+    ]
+
+
+def rebuild(batch_size=500):
+    """
+    Re-indexes every thread and response, `batch_size` rows per statement.
+
+    :return int number of indexed rows
+    """
+    # one transaction, so searches never see a partial index and a
+    # failure leaves the old one in place
+    with transaction.atomic():
+        return _rebuild(batch_size)
+
+
+def _rebuild(batch_size):
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM {}'.format(SEARCH_TABLE))
+
+    threads = Thread.objects.order_by('pk').values_list(
+        'pk', 'name', 'message', 'forum_id'
+    )
+    responses = ThreadResponse.objects.order_by('pk').values_list(
+        'pk', 'message', 'thread_id', 'thread__forum_id'
+    )
+
+    indexed = 0
+    for queryset, to_row in ((threads, thread_row),
+                             (responses, response_row)):
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    INSERT_SQL, [to_row(*values) for values in batch]
+                )
+            indexed += len(batch)
+            last_pk = batch[-1][0]
+
+    return indexed
@@ -2,22 +2,102 @@ from rest_framework import serializers
 
 from forumapp.models import Forum, Thread, ForumUser, ThreadResponse, \
     LikeDislike, ForumSection
+from forumapp.timing import timed
+from forumapp.votes import vote_buffer
 
 
-class ForumSectionSerializer(serializers.ModelSerializer):
+def wants_id_lists(request):
+    """
+    Nested id lists are only serialized when asked for with ?include_ids=true.
+    """
+    if request is None:
+        return False
+
+    return request.query_params.get('include_ids', '').lower() == 'true'
+
+
+class IdListsMixin(object):
+    """
+    Drops the unbounded `id_list_fields` unless the request asks for them.
+    """
+    id_list_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super(IdListsMixin, self).__init__(*args, **kwargs)
+        if not wants_id_lists(self.context.get('request')):
+            for field in self.id_list_fields:
+                self.fields.pop(field, None)
+
+
+def requested_fields(request):
+    """
+    Field names asked for with ?fields=a,b, or None for all fields.
+    """
+    if request is None or not request.query_params.get('fields'):
+        return None
+
+    return {
+        name.strip() for name in request.query_params['fields'].split(',')
+        if name.strip()
+    }
+
+
+def only_model_fields(serializer_class, fields):
+    """
+    Concrete model fields to load for a sparse field selection, so that
+    unselected columns like message bodies are never read.
+    """
+    model = serializer_class.Meta.model
+    concrete = {field.name for field in model._meta.concrete_fields}
+    return {'id'} | (set(fields) & concrete)
+
+
+class SparseFieldsMixin(object):
+    """
+    Drops every field not listed in ?fields=, except for the id.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(SparseFieldsMixin, self).__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields is not None:
+            for field in set(self.fields) - fields - {'id'}:
+                self.fields.pop(field)
+
+
+class TimedMixin(object):
+    """
+    Counts serialization towards the serializer time of the request.
+    """
+
+    def to_representation(self, instance):
+        with timed('serializer'):
+            return super(TimedMixin, self).to_representation(instance)
+
+
+class ForumSectionSerializer(TimedMixin, serializers.ModelSerializer):
     class Meta:
         model = ForumSection
         fields = '__all__'
 
 
-class ThreadSerializer(serializers.ModelSerializer):
+class ThreadSerializer(
+    TimedMixin,
+    SparseFieldsMixin,
+    IdListsMixin,
+    serializers.ModelSerializer
+):
+    response_count = serializers.SerializerMethodField()
+
+    id_list_fields = ('threadresponse_set',)
+
     class Meta:
         model = Thread
         # fields = ('name', 'forum', 'pinned', 'threadresponse_set')
         fields = (
             'name', 'forum', 'pinned', 'message',
             'creator', 'id', 'created_datetime', 'last_activity',
-            'threadresponse_set'
+            'response_count', 'threadresponse_set'
         )
         # fields = '__all__'
         extra_kwargs = {
@@ -26,8 +106,24 @@ class ThreadSerializer(serializers.ModelSerializer):
             'creator': {'read_only': True},
         }
 
+    def get_response_count(self, thread):
+        # annotated by Thread.objects.with_counts() on list endpoints
+        if hasattr(thread, 'response_count'):
+            return thread.response_count
+
+        return thread.threadresponse_set.count()
+
+
+class ForumSerializer(
+    TimedMixin,
+    IdListsMixin,
+    serializers.ModelSerializer
+):
+    thread_count = serializers.IntegerField(read_only=True)
+    last_activity = serializers.DateTimeField(read_only=True)
+
+    id_list_fields = ('thread_set',)
 
-class ForumSerializer(serializers.ModelSerializer):
     class Meta:
         model = Forum
         fields = (
@@ -35,35 +131,71 @@ class ForumSerializer(serializers.ModelSerializer):
             'name',
             'description',
             'section',
+            'thread_count',
+            'last_activity',
             'thread_set'
         )
 
 
-class ThreadResponseSerializer(serializers.ModelSerializer):
+class ThreadResponseSerializer(
+    TimedMixin,
+    SparseFieldsMixin,
+    serializers.ModelSerializer
+):
     class Meta:
         model = ThreadResponse
-        fields = ('thread', 'message', 'created_datetime', 'id', 'creator')
+        fields = (
+            'thread', 'message', 'created_datetime', 'id', 'creator',
+            'likes', 'dislikes', 'position'
+        )
         extra_kwargs = {
             'created_datetime': {'read_only': True},
             'id': {'read_only': True},
-            'creator': {'read_only': True}
+            'creator': {'read_only': True},
+            'likes': {'read_only': True},
+            'dislikes': {'read_only': True},
         }
 
+    def to_representation(self, instance):
+        data = super(ThreadResponseSerializer, self).to_representation(
+            instance
+        )
+        if 'likes' in data and 'dislikes' in data:
+            likes, dislikes = self.vote_deltas().get(instance.id, (0, 0))
+            data['likes'] += likes
+            data['dislikes'] += dislikes
+
+        return data
+
+    def vote_deltas(self):
+        """
+        Buffered vote deltas, taken once per serialization and shared by
+        every response of a page through the context.
+        """
+        if 'vote_deltas' not in self.context:
+            self.context['vote_deltas'] = \
+                vote_buffer.deltas() if len(vote_buffer) else {}
+
+        return self.context['vote_deltas']
+
 
-class ThreadUpdateSerializer(serializers.ModelSerializer):
+class ThreadUpdateSerializer(TimedMixin, serializers.ModelSerializer):
     class Meta:
         model = Thread
         fields = ('message',)
 
 
-class ThreadResponseUpdateSerializer(serializers.ModelSerializer):
+class ThreadResponseUpdateSerializer(
+    TimedMixin,
+    serializers.ModelSerializer
+):
     class Meta:
         model = ThreadResponse
         fields = ('message',)
 
 
-class ForumUserSerializer(serializers.ModelSerializer):
-    username = serializers.CharField(source='user.username')
+class ForumUserSerializer(TimedMixin, serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
 
     class Meta:
         model = ForumUser
@@ -75,7 +207,7 @@ class ForumUserSerializer(serializers.ModelSerializer):
         }
 
 
-class LikeDislikeSerializer(serializers.ModelSerializer):
+class LikeDislikeSerializer(TimedMixin, serializers.ModelSerializer):
     class Meta:
         model = LikeDislike
         fields = ['like', 'response', ]
@@ -0,0 +1,255 @@
+import threading
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from forumapp import search
+from forumapp.authentication import forget_token
+from forumapp.responsecache import bump_generations
+
+from forumapp.models import Forum, ForumSection, ForumSummary, ForumUser, \
+    Thread, ThreadResponse, SiteStatistics, ContentVersion
+
+class _DeleteState(threading.local):
+    """
+    State of the delete running in the current (OS) thread. A delete sends
+    every pre_delete before the first post_delete, and cascaded rows get
+    their post_delete before the row they cascade from, so handlers of
+    cascaded rows can leave the work to one statement for the whole delete.
+
+    The state is tied to the transaction of the delete by a callback
+    registered with on_commit. A delete that fails or is rolled back takes
+    the callback with it, so the next delete starts afresh instead of
+    inheriting its pks and counts.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self.marker = None
+        # pks of the forum threads being deleted
+        self.threads = set()
+        # pks of the ForumUsers of the auth users being deleted
+        self.forum_users = set()
+        # SiteStatistics deltas not applied yet
+        self.counts = Counter()
+
+    def _alive(self, using):
+        return self.marker is not None and any(
+            func is self.marker
+            for _, func in connections[using].run_on_commit
+        )
+
+    def get(self, using):
+        """
+        :return the state of the delete in progress; empty if there is none
+        """
+        if not self._alive(using):
+            self._clear()
+
+        return self
+
+    def begin(self, using):
+        """
+        get() for pre_delete handlers, which tie the state to the
+        transaction of the delete.
+        """
+        if not self._alive(using):
+            self._clear()
+
+            def marker():
+                if self.marker is marker:
+                    self._clear()
+
+            self.marker = marker
+            transaction.on_commit(marker, using)
+
+        return self
+
+
+_deleting = _DeleteState()
+
+
+# model -> SiteStatistics counter it is counted in
+STATISTICS_COUNTERS = {
+    User: 'users',
+    Thread: 'threads',
+    ThreadResponse: 'responses',
+}
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+@receiver(pre_delete, sender=Thread)
+def begin_thread_delete(sender, instance, using, **kwargs):
+    _deleting.begin(using).threads.add(instance.pk)
+
+
+@receiver(post_save, sender=Forum)
+def create_forum_summary(sender, instance, created, **kwargs):
+    if created:
+        ForumSummary.objects.get_or_create(forum=instance)
+
+
+@receiver(post_save, sender=Thread)
+def record_thread_activity(sender, instance, **kwargs):
+    ForumSummary.record_activity(instance)
+
+
+@receiver(post_save, sender=Forum)
+@receiver(post_delete, sender=Forum)
+def bump_forum_version(sender, instance, **kwargs):
+    ContentVersion.bump(ContentVersion.forum_key(instance.pk))
+
+
+@receiver(post_save, sender=ForumSection)
+@receiver(post_delete, sender=ForumSection)
+def bump_section_generation(sender, instance, **kwargs):
+    # sections have no version of their own, only cached listings
+    bump_generations()
+
+
+@receiver(post_save, sender=Thread)
+@receiver(post_delete, sender=Thread)
+def bump_thread_version(sender, instance, **kwargs):
+    ContentVersion.bump(
+        ContentVersion.thread_key(instance.pk),
+        ContentVersion.forum_key(instance.forum_id)
+    )
+
+
+def _forum_id_of(response):
+    if ThreadResponse.thread.field.is_cached(response):
+        return response.thread.forum_id
+
+    # the thread may already be gone when deletes cascade
+    return Thread.objects.filter(pk=response.thread_id).values_list(
+        'forum',
+        flat=True
+    ).first()
+
+
+@receiver(post_save, sender=ThreadResponse)
+@receiver(post_delete, sender=ThreadResponse)
+def bump_response_versions(sender, instance, using, signal, **kwargs):
+    # bump_thread_version covers the whole thread once when it is deleted
+    if signal is post_delete and \
+            instance.thread_id in _deleting.get(using).threads:
+        return
+
+    keys = [ContentVersion.thread_key(instance.thread_id)]
+    # forum listings show the latest response's message, so edits count
+    forum_id = _forum_id_of(instance)
+    if forum_id is not None:
+        keys.append(ContentVersion.forum_key(forum_id))
+
+    ContentVersion.bump(*keys)
+
+
+@receiver(post_delete, sender=Thread)
+def forget_deleted_thread(sender, instance, **kwargs):
+    # SET_NULL has already cleared the summary if it pointed to this thread
+    if ForumSummary.objects.filter(
+            forum_id=instance.forum_id,
+            latest_thread__isnull=True
+    ).exists():
+        ForumSummary.refresh(instance.forum_id)
+
+
+@receiver(post_save, sender=Thread)
+def index_thread(sender, instance, **kwargs):
+    search.index_thread(instance)
+
+
+@receiver(post_save, sender=ThreadResponse)
+def index_response(sender, instance, **kwargs):
+    search.index_response(instance, _forum_id_of(instance))
+
+
+@receiver(post_delete, sender=Thread)
+def unindex_deleted_thread(sender, instance, **kwargs):
+    search.unindex_thread(instance.pk)
+
+
+@receiver(post_delete, sender=ThreadResponse)
+def unindex_deleted_response(sender, instance, using, **kwargs):
+    # removed with the thread when the delete cascades from it
+    if instance.thread_id not in _deleting.get(using).threads:
+        search.unindex(search.RESPONSE, instance.pk)
+
+
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        SiteStatistics.adjust(**{STATISTICS_COUNTERS[sender]: 1})
+
+
+@receiver(pre_delete, sender=Thread)
+def count_deleted_thread(sender, instance, using, **kwargs):
+    # the responses are still there; they are counted here, once
+    _deleting.begin(using).counts.update(
+        threads=-1,
+        responses=-ThreadResponse.objects.filter(thread=instance).count()
+    )
+
+
+@receiver(pre_delete, sender=User)
+def count_deleted_user(sender, instance, using, **kwargs):
+    state = _deleting.begin(using)
+    forum_users = set(ForumUser.objects.filter(user=instance).values_list(
+        'pk',
+        flat=True
+    ))
+    state.forum_users.update(forum_users)
+    # responses in the user's own threads are counted with the threads
+    state.counts.update(
+        users=-1,
+        responses=-ThreadResponse.objects.filter(
+            creator__in=forum_users
+        ).exclude(thread__creator__in=forum_users).count()
+    )
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=ForumUser)
+@receiver(post_delete, sender=Thread)
+@receiver(post_delete, sender=ThreadResponse)
+def apply_deleted_counts(sender, instance, using, **kwargs):
+    # runs on the first post_delete, once every pre_delete has counted
+    counts = _deleting.get(using).counts
+    if counts:
+        SiteStatistics.adjust(**counts)
+        counts.clear()
+
+
+@receiver(post_delete, sender=ThreadResponse)
+def count_deleted_response(sender, instance, using, **kwargs):
+    state = _deleting.get(using)
+    if instance.thread_id in state.threads or \
+            instance.creator_id in state.forum_users:
+        return
+
+    SiteStatistics.adjust(responses=-1)
+
+
+for model in STATISTICS_COUNTERS:
+    post_save.connect(count_created, sender=model)
+
+
+@receiver(post_delete, sender=Thread)
+def end_thread_delete(sender, instance, using, **kwargs):
+    # connected last, after every other post_delete handler
+    _deleting.get(using).threads.discard(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def end_user_delete(sender, instance, using, **kwargs):
+    # the ForumUser is gone by now, the auth user is deleted last
+    _deleting.get(using).forum_users.clear()
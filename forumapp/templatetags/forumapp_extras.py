@@ -1,12 +1,8 @@
 from django import template
 
-register = template.Library()
-
+from forumapp.votes import user_votes
 
-@register.filter(name='can_remove_response')
-def can_remove_response(response, user):
-    return user == response.responder or \
-           user.has_perm('forumapp.can_remove_any_response')
+register = template.Library()
 
 
 @register.filter(name='times0')
@@ -20,11 +16,8 @@ def times(count):
 
 
 @register.filter(name='summarize_likes')
-def summarize_likes(likes_dislikes):
-    likes = likes_dislikes.filter(like=True).count()
-    dislikes = likes_dislikes.filter(like=False).count()
-
-    return likes - dislikes
+def summarize_likes(response):
+    return response.likes - response.dislikes
 
 
 @register.filter(name='capitalize')
@@ -33,9 +26,8 @@ def capitalize(text):
 
 
 @register.filter(name='voted_by_user')
-def voted_by_user(likes_list, user):
-    result = likes_list.filter(user=user)
-    if result.count() == 0:
-        return 0
+def voted_by_user(response, user):
+    if hasattr(response, 'user_vote'):
+        return response.user_vote
 
-    return 1 if result.first().like else -1
+    return user_votes(user, [response.id])[response.id]
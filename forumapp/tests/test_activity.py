@@ -0,0 +1,102 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.activity import activity_buffer, record_reply
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse, ContentVersion
+
+
+class ThreadActivityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='activity')
+        cls.forum = Forum.objects.create(name='activity', section=section)
+        cls.user = User.objects.create_user(username='activity')
+        cls.forum_user = ForumUser.objects.create(user=cls.user)
+        cls.thread = Thread.objects.create(
+            name='thread',
+            forum=cls.forum,
+            creator=cls.forum_user,
+            last_activity=timezone.now() - datetime.timedelta(hours=1)
+        )
+
+    def last_activity(self):
+        return Thread.objects.values_list(
+            'last_activity',
+            flat=True
+        ).get(pk=self.thread.pk)
+
+    def test_reply_updates_only_last_activity(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            client.post(
+                reverse('threadresponse-list'),
+                {'thread': self.thread.pk, 'message': 'reply'}
+            )
+
+        thread_updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "forumapp_thread"')
+        ]
+        self.assertEqual(len(thread_updates), 1)
+        self.assertIn('SET "last_activity" = ', thread_updates[0])
+        self.assertNotIn('"message"', thread_updates[0])
+        self.assertGreater(self.last_activity(), self.thread.last_activity)
+        self.assertEqual(
+            Forum.objects.with_counts().get(pk=self.forum.pk).last_activity,
+            self.last_activity()
+        )
+
+    def test_failed_reply_leaves_activity(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch.object(
+                ThreadResponse,
+                'save',
+                side_effect=IntegrityError
+        ), self.assertRaises(IntegrityError):
+            client.post(
+                reverse('threadresponse-list'),
+                {'thread': self.thread.pk, 'message': 'reply'}
+            )
+
+        self.assertEqual(self.last_activity(), self.thread.last_activity)
+
+    def test_never_moves_backwards(self):
+        newer = timezone.now()
+        record_reply(self.thread, newer)
+        record_reply(self.thread, newer - datetime.timedelta(minutes=1))
+        self.assertEqual(self.last_activity(), newer)
+
+    @override_settings(FORUMAPP_ACTIVITY_WRITE_BEHIND=True)
+    @mock.patch.object(activity_buffer, 'interval', 0)
+    def test_write_behind_coalesces_bumps(self):
+        latest = timezone.now()
+        for minutes in (3, 1, 0, 2):
+            record_reply(self.thread, latest - datetime.timedelta(
+                minutes=minutes
+            ))
+        self.assertEqual(self.last_activity(), self.thread.last_activity)
+
+        version, _ = ContentVersion.lookup(
+            ContentVersion.forum_key(self.forum.pk)
+        )
+        with self.assertNumQueries(4):
+            # thread, forum summary and the two content versions
+            self.assertEqual(activity_buffer.flush(), 1)
+
+        self.assertEqual(self.last_activity(), latest)
+        self.assertEqual(
+            ContentVersion.lookup(ContentVersion.forum_key(self.forum.pk))[0],
+            version + 1
+        )
+        self.assertEqual(activity_buffer.flush(), 0)
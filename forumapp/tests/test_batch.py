@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse, SiteStatistics
+
+
+class BatchRequestTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='batch')
+        forum = Forum.objects.create(name='batch', section=section)
+        user = User.objects.create_user(username='batch', password='pass')
+        cls.forum_user = ForumUser.objects.create(user=user)
+        cls.token = Token.objects.create(user=user)
+        cls.thread = Thread.objects.create(
+            name='thread',
+            forum=forum,
+            creator=cls.forum_user
+        )
+        cls.response = ThreadResponse.objects.create(
+            thread=cls.thread,
+            creator=cls.forum_user,
+            message='first'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('rest-batch')
+
+    def batch(self, *paths):
+        return self.client.post(
+            self.url,
+            {'requests': [{'path': path} for path in paths]},
+            format='json'
+        )
+
+    def test_thread_page(self):
+        thread_url = reverse('thread-detail', kwargs={'pk': self.thread.pk})
+        responses_url = reverse(
+            'rest-thread-responses',
+            kwargs={'pk': self.thread.pk}
+        )
+        responses_url += '?page_size=1'
+        response = self.batch(thread_url, responses_url)
+
+        self.assertEqual(response.status_code, 200)
+        thread_part, responses_part = response.data
+        self.assertEqual(thread_part['status'], 200)
+        self.assertEqual(thread_part['body']['name'], 'thread')
+        self.assertEqual(responses_part['path'], responses_url)
+        self.assertEqual(
+            [row['id'] for row in responses_part['body']['results']],
+            [self.response.pk]
+        )
+
+    def test_parts_share_authentication(self):
+        votes_url = reverse('rest-likedislike-bulk') + '?responses[]=%d' \
+            % self.response.pk
+
+        anonymous = self.batch(votes_url)
+        self.assertEqual(anonymous.data[0]['status'], 401)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        authenticated = self.batch(votes_url)
+        self.assertEqual(authenticated.data[0]['status'], 200)
+        self.assertEqual(
+            authenticated.data[0]['body'],
+            {str(self.response.pk): 0}
+        )
+
+    def test_missing_object(self):
+        response = self.batch(reverse('thread-detail', kwargs={'pk': 0}))
+        self.assertEqual(response.data[0]['status'], 404)
+
+    def test_rejects_paths_outside_api(self):
+        self.assertEqual(self.batch(reverse('forums')).status_code, 400)
+        self.assertEqual(self.batch('/nowhere/').status_code, 400)
+
+    def test_rejects_nested_batches(self):
+        self.assertEqual(self.batch(self.url).status_code, 400)
+
+    def test_rejects_exports(self):
+        path = reverse('rest-export', kwargs={'scope': 'forum', 'pk': 1})
+        self.assertEqual(self.batch(path).status_code, 400)
+
+    def test_failing_part(self):
+        with mock.patch.object(SiteStatistics, 'get', side_effect=KeyError), \
+                self.assertLogs('forumapp.batch', 'ERROR'):
+            response = self.batch(
+                reverse('rest-stats'),
+                reverse('thread-detail', kwargs={'pk': self.thread.pk})
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [part['status'] for part in response.data],
+            [500, 200]
+        )
+
+    def test_rejects_writes(self):
+        response = self.client.post(
+            self.url,
+            {'requests': [{'method': 'DELETE', 'path': reverse('api-root')}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(FORUMAPP_BATCH_MAX_REQUESTS=1)
+    def test_limit(self):
+        path = reverse('rest-stats')
+        self.assertEqual(self.batch(path, path).status_code, 400)
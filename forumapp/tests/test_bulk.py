@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse
+
+
+class BulkFetchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='bulk')
+        forum = Forum.objects.create(name='bulk', section=section)
+        cls.forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='bulk')
+        )
+        cls.threads = [
+            Thread.objects.create(
+                name='thread%d' % i,
+                message='message%d' % i,
+                forum=forum,
+                creator=cls.forum_user
+            ) for i in range(3)
+        ]
+        cls.response = ThreadResponse.objects.create(
+            thread=cls.threads[0],
+            creator=cls.forum_user,
+            message='response'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get_threads(self, ids, **params):
+        params['threads[]'] = ids
+        return self.client.get(reverse('rest-threads-bulk'), params)
+
+    def test_requested_order_and_missing(self):
+        ids = [self.threads[2].pk, 0, self.threads[0].pk, self.threads[2].pk]
+        response = self.get_threads(ids)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [thread['id'] for thread in response.data['results']],
+            [self.threads[2].pk, self.threads[0].pk]
+        )
+        self.assertEqual(response.data['missing'], [0])
+
+    def test_sparse_fields(self):
+        response = self.get_threads([self.threads[0].pk], fields='name')
+        self.assertEqual(
+            response.data['results'],
+            [{'id': self.threads[0].pk, 'name': 'thread0'}]
+        )
+
+    def test_invalid_ids(self):
+        response = self.get_threads(['1', 'abc'])
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(FORUMAPP_BULK_MAX_IDS=2)
+    def test_too_many_ids(self):
+        response = self.get_threads([thread.pk for thread in self.threads])
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(FORUMAPP_BULK_CHUNK_SIZE=2)
+    def test_chunked_in_lists(self):
+        with self.assertNumQueries(2):
+            response = self.get_threads([t.pk for t in self.threads])
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_responses(self):
+        response = self.client.get(
+            reverse('rest-responses-bulk'),
+            {'responses[]': [self.response.pk, 0], 'fields': 'message'}
+        )
+        self.assertEqual(response.data, {
+            'results': [{'id': self.response.pk, 'message': 'response'}],
+            'missing': [0]
+        })
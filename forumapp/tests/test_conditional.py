@@ -0,0 +1,99 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='conditional')
+        cls.forum = Forum.objects.create(name='conditional', section=section)
+        cls.forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='conditional')
+        )
+        cls.thread = Thread.objects.create(
+            name='thread',
+            forum=cls.forum,
+            creator=cls.forum_user
+        )
+        cls.response = ThreadResponse.objects.create(
+            thread=cls.thread,
+            creator=cls.forum_user,
+            message='first'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        # anonymous responses would come from the response cache
+        self.client.force_authenticate(self.forum_user.user)
+        self.responses_url = reverse(
+            'rest-thread-responses',
+            kwargs={'pk': self.thread.pk}
+        )
+
+    def assertNotModified(self, url, **headers):
+        with self.assertNumQueries(1):
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.responses_url)['ETag']
+        self.assertNotModified(self.responses_url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.responses_url)['Last-Modified']
+        self.assertNotModified(
+            self.responses_url,
+            HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+    def test_reply_changes_etag(self):
+        etag = self.client.get(self.responses_url)['ETag']
+        ThreadResponse.objects.create(
+            thread=self.thread,
+            creator=self.forum_user,
+            message='second'
+        )
+        response = self.client.get(
+            self.responses_url,
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_vote_changes_etag(self):
+        etag = self.client.get(self.responses_url)['ETag']
+        voter = APIClient()
+        voter.force_authenticate(self.forum_user.user)
+        voter.post(
+            reverse('rest-likedislike', kwargs={'pk': self.response.pk}),
+            {'like': 'true'}
+        )
+        response = self.client.get(
+            self.responses_url,
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_thread_and_forum_detail(self):
+        for url in (
+            reverse('thread-detail', kwargs={'pk': self.thread.pk}),
+            reverse('forum-detail', kwargs={'pk': self.forum.pk}),
+            reverse('rest-forum-threads', kwargs={'pk': self.forum.pk}),
+        ):
+            etag = self.client.get(url)['ETag']
+            self.assertNotModified(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_pin_changes_forum_etag(self):
+        url = reverse('rest-forum-threads', kwargs={'pk': self.forum.pk})
+        etag = self.client.get(url)['ETag']
+        self.thread.pinned = True
+        self.thread.save()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200
+        )
@@ -0,0 +1,97 @@
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='export')
+        cls.forum = Forum.objects.create(name='export', section=section)
+        cls.admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='pass'
+        )
+        cls.forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='export')
+        )
+        cls.thread = Thread.objects.create(
+            name='thread',
+            message='opening',
+            forum=cls.forum,
+            creator=cls.forum_user
+        )
+        cls.responses = [
+            ThreadResponse.objects.create(
+                thread=cls.thread,
+                creator=cls.forum_user,
+                message='response%d' % i
+            ) for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, scope, pk, **params):
+        response = self.client.get(
+            reverse('rest-export', kwargs={'scope': scope, 'pk': pk}),
+            params
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        rows = [
+            json.loads(line) for line in
+            self.export('thread', self.thread.pk).splitlines()
+        ]
+        self.assertEqual(
+            [(row['kind'], row['message']) for row in rows],
+            [('thread', 'opening'), ('response', 'response0'),
+             ('response', 'response1'), ('response', 'response2')]
+        )
+        self.assertEqual(rows[1]['forum'], self.forum.pk)
+
+    def test_json_array(self):
+        rows = json.loads(
+            self.export('user', self.forum_user.pk, output='json')
+        )
+        self.assertEqual(len(rows), 4)
+
+        empty = ForumUser.objects.create(
+            user=User.objects.create_user(username='empty')
+        )
+        self.assertEqual(
+            json.loads(self.export('user', empty.pk, output='json')),
+            []
+        )
+
+    def test_unknown_target(self):
+        url = reverse('rest-export', kwargs={'scope': 'forum', 'pk': 0})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        url = reverse('rest-export', kwargs={'scope': 'section', 'pk': 1})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(None)
+        url = reverse('rest-export', kwargs={'scope': 'forum', 'pk': 1})
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'export_posts', 'forum', str(self.forum.pk),
+            chunk_size=1, stdout=out
+        )
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
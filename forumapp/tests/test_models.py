@@ -1,10 +1,19 @@
 import datetime
+import unittest
+from io import StringIO
+from unittest import mock
 
 from django.contrib.auth.models import User
-from django.db import IntegrityError
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, \
+    transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.sql import DeleteQuery
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from forumapp.models import ForumSection, Forum, Thread, ThreadResponse
+from forumapp.models import ForumSection, Forum, Thread, ThreadResponse, \
+    ForumUser, LikeDislike, SiteStatistics, ContentVersion, NEXT_POSITION_SQL
 
 
 class ForumSectionModelTest(TestCase):
@@ -224,3 +233,344 @@ class ThreadResponseModelTest(TestCase):
             str(thread_response),
             'My Message'
         )
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN')
+class AccessPathIndexTest(TestCase):
+    """
+    Every hot query has to be answered from an index: no full table scan
+    and no temporary B-tree for the ORDER BY.
+    """
+
+    def assertIndexed(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+
+        for step in plan:
+            self.assertNotIn('TEMP B-TREE', step, plan)
+            if step.startswith('SCAN'):
+                self.assertIn('INDEX', step, plan)
+
+    def test_forum_threads(self):
+        self.assertIndexed(Thread.objects.filter(forum=1).order_by(
+            '-pinned', '-last_activity', '-id'
+        )[:21])
+
+    def test_forum_threads_with_counts(self):
+        self.assertIndexed(Thread.objects.filter(forum=1).with_counts(
+        ).order_by('-pinned', '-last_activity', '-id')[:21])
+
+    def test_thread_responses(self):
+        self.assertIndexed(ThreadResponse.objects.filter(thread=1).order_by(
+            'created_datetime', 'id'
+        )[:21])
+
+    def test_user_threads(self):
+        self.assertIndexed(Thread.objects.filter(creator=1).order_by(
+            '-created_datetime', '-id'
+        ).values('id', 'name', 'forum', 'created_datetime')[:11])
+
+    def test_user_responses(self):
+        self.assertIndexed(ThreadResponse.objects.filter(creator=1).order_by(
+            '-created_datetime', '-id'
+        ).values('id', 'thread__forum')[:11])
+
+    def test_user_vote(self):
+        self.assertIndexed(LikeDislike.objects.filter(user=1, response=1))
+
+    def test_user_votes_on_page(self):
+        self.assertIndexed(LikeDislike.objects.filter(
+            user__user=1,
+            response__in=[1, 2, 3]
+        ).values_list('response', 'like'))
+
+    def test_vote_is_unique_per_user(self):
+        section = ForumSection.objects.create(name='unique')
+        forum = Forum.objects.create(name='unique', section=section)
+        forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='unique')
+        )
+        thread = Thread.objects.create(
+            name='thread',
+            forum=forum,
+            creator=forum_user
+        )
+        response = ThreadResponse.objects.create(
+            thread=thread,
+            creator=forum_user
+        )
+        LikeDislike.objects.create(user=forum_user, response=response)
+
+        with self.assertRaises(IntegrityError):
+            LikeDislike.objects.create(user=forum_user, response=response)
+
+
+class ForumSummaryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='summaries')
+        cls.forum = Forum.objects.create(name='summaries', section=section)
+        cls.forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='summaries')
+        )
+
+    def create_thread(self, name, minutes_ago):
+        return Thread.objects.create(
+            name=name,
+            forum=self.forum,
+            creator=self.forum_user,
+            last_activity=datetime.datetime.now() - datetime.timedelta(
+                minutes=minutes_ago
+            )
+        )
+
+    def latest(self):
+        return self.client.get('/forumapp/rest/forum_latest/').json()
+
+    def test_summary_created_with_forum(self):
+        self.assertIsNone(self.forum.summary.latest_thread)
+        self.assertEqual(self.latest(), [])
+
+    def test_latest_thread_tracks_activity(self):
+        older = self.create_thread('older', 10)
+        self.create_thread('newer', 5)
+        self.assertEqual(self.latest(), [{
+            'name': 'newer',
+            'id': Thread.objects.get(name='newer').id,
+            'forum': self.forum.id
+        }])
+
+        older.last_activity = datetime.datetime.now()
+        older.save()
+        self.assertEqual(self.latest()[0]['name'], 'older')
+
+    def test_latest_thread_deleted(self):
+        self.create_thread('older', 10)
+        self.create_thread('newer', 5).delete()
+        self.assertEqual(self.latest()[0]['name'], 'older')
+
+        Thread.objects.get(name='older').delete()
+        self.assertEqual(self.latest(), [])
+
+
+class ThreadDeleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='delete')
+        cls.forum = Forum.objects.create(name='delete', section=section)
+        cls.forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='delete')
+        )
+
+    def create_thread(self, responses):
+        thread = Thread.objects.create(
+            name='thread',
+            forum=self.forum,
+            creator=self.forum_user
+        )
+        for i in range(responses):
+            ThreadResponse.objects.create(
+                thread=thread,
+                creator=self.forum_user,
+                message='response%d' % i
+            )
+        return thread
+
+    def test_versions_bumped_once(self):
+        thread = self.create_thread(3)
+        keys = [
+            ContentVersion.thread_key(thread.pk),
+            ContentVersion.forum_key(self.forum.pk)
+        ]
+        before = [ContentVersion.lookup(key)[0] for key in keys]
+        thread.delete()
+        self.assertEqual(
+            [ContentVersion.lookup(key)[0] for key in keys],
+            [version + 1 for version in before]
+        )
+
+    def test_failed_delete_keeps_bumping_responses(self):
+        thread = self.create_thread(2)
+        with self.assertRaises(OperationalError):
+            with transaction.atomic(), mock.patch.object(
+                    DeleteQuery,
+                    'delete_batch',
+                    side_effect=OperationalError('database is locked')
+            ):
+                Thread.objects.get(pk=thread.pk).delete()
+
+        key = ContentVersion.thread_key(thread.pk)
+        version, _ = ContentVersion.lookup(key)
+        thread.threadresponse_set.first().delete()
+        self.assertEqual(ContentVersion.lookup(key)[0], version + 1)
+
+
+class SiteStatisticsTest(TestCase):
+    def test_counters_follow_creates_and_deletes(self):
+        section = ForumSection.objects.create(name='statistics')
+        forum = Forum.objects.create(name='statistics', section=section)
+        forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='statistics')
+        )
+        thread = Thread.objects.create(
+            name='thread',
+            forum=forum,
+            creator=forum_user
+        )
+        ThreadResponse.objects.create(thread=thread, creator=forum_user)
+
+        statistics = SiteStatistics.get()
+        self.assertEqual(
+            (statistics.users, statistics.threads, statistics.responses),
+            (1, 1, 1)
+        )
+
+        # cascades to the response
+        thread.delete()
+        statistics = SiteStatistics.get()
+        self.assertEqual((statistics.threads, statistics.responses), (0, 0))
+
+    def test_cascades_adjust_once(self):
+        section = ForumSection.objects.create(name='cascade')
+        forum = Forum.objects.create(name='cascade', section=section)
+        author, other = [
+            ForumUser.objects.create(
+                user=User.objects.create_user(username=name)
+            ) for name in ('author', 'other')
+        ]
+        own = Thread.objects.create(name='own', forum=forum, creator=author)
+        others = Thread.objects.create(
+            name='others',
+            forum=forum,
+            creator=other
+        )
+        for creator in (author, other, other):
+            ThreadResponse.objects.create(thread=own, creator=creator)
+        for creator in (author, other):
+            ThreadResponse.objects.create(thread=others, creator=creator)
+
+        with CaptureQueriesContext(connection) as queries:
+            User.objects.get(pk=author.user_id).delete()
+        self.assertEqual(len([
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "forumapp_sitestatistics"')
+        ]), 1)
+
+        statistics = SiteStatistics.get()
+        self.assertEqual(
+            (statistics.users, statistics.threads, statistics.responses),
+            (1, 1, 1)
+        )
+
+    def test_failed_delete_leaves_no_deltas(self):
+        section = ForumSection.objects.create(name='rollback')
+        forum = Forum.objects.create(name='rollback', section=section)
+        forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='rollback')
+        )
+        failing, deleted = [
+            Thread.objects.create(name=name, forum=forum, creator=forum_user)
+            for name in ('failing', 'deleted')
+        ]
+        ThreadResponse.objects.create(thread=failing, creator=forum_user)
+
+        with self.assertRaises(OperationalError):
+            with transaction.atomic(), mock.patch.object(
+                    DeleteQuery,
+                    'delete_batch',
+                    side_effect=OperationalError('database is locked')
+            ):
+                failing.delete()
+
+        Thread.objects.get(pk=deleted.pk).delete()
+        statistics = SiteStatistics.get()
+        self.assertEqual(
+            (statistics.users, statistics.threads, statistics.responses),
+            (1, 1, 1)
+        )
+
+    def test_reconcile_fixes_drift(self):
+        User.objects.create_user(username='drift')
+        SiteStatistics.objects.update(users=42)
+        call_command('reconcile_stats', stdout=StringIO())
+        self.assertEqual(SiteStatistics.get().users, 1)
+
+    def test_stats_endpoint(self):
+        User.objects.create_user(username='endpoint')
+        with self.assertNumQueries(1):
+            response = self.client.get('/forumapp/rest/stats/')
+
+        self.assertEqual(response.json(), {
+            'users': 1,
+            'threads': 0,
+            'responses': 0
+        })
+
+
+class ResponsePositionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='positions')
+        forum = Forum.objects.create(name='positions', section=section)
+        cls.forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='positions')
+        )
+        cls.threads = [
+            Thread.objects.create(
+                name='thread%d' % i,
+                forum=forum,
+                creator=cls.forum_user
+            ) for i in range(2)
+        ]
+
+    def respond(self, thread):
+        return ThreadResponse.objects.create(
+            thread=thread,
+            creator=self.forum_user
+        )
+
+    def test_numbered_per_thread(self):
+        first, other, second = (
+            self.respond(self.threads[0]),
+            self.respond(self.threads[1]),
+            self.respond(self.threads[0])
+        )
+        self.assertEqual(
+            (first.position, other.position, second.position),
+            (1, 1, 2)
+        )
+
+    def test_deletes_leave_gaps(self):
+        first, second, third = [
+            self.respond(self.threads[0]) for _ in range(3)
+        ]
+        second.delete()
+
+        third.refresh_from_db()
+        self.assertEqual(third.position, 3)
+        self.assertEqual(self.respond(self.threads[0]).position, 4)
+
+    def test_position_taken_by_insert(self):
+        self.respond(self.threads[0])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.respond(self.threads[0])
+
+        self.assertEqual(response.position, 2)
+        insert, = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "forumapp_threadresponse"')
+        ]
+        self.assertIn('MAX(position)', insert)
+
+    def test_taken_position_is_retried(self):
+        self.respond(self.threads[0])
+        # another database lets a concurrent reply read the same MAX
+        with mock.patch('forumapp.models.RawSQL', side_effect=[
+            RawSQL('SELECT 1', ()),
+            RawSQL(NEXT_POSITION_SQL, (self.threads[0].pk,))
+        ]):
+            response = self.respond(self.threads[0])
+
+        self.assertEqual(response.position, 2)
@@ -0,0 +1,120 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse
+from forumapp.pagination import ResponseCursorPagination, encode_cursor
+
+
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='section1')
+        cls.forum = Forum.objects.create(
+            name='Paginated',
+            description='Desc1',
+            section=section
+        )
+        user = User.objects.create_user(username='paginator')
+        forum_user = ForumUser.objects.create(user=user)
+
+        now = timezone.now()
+        cls.threads = [
+            Thread.objects.create(
+                name='thread%d' % i,
+                forum=cls.forum,
+                message='message',
+                creator=forum_user,
+                pinned=i == 3,
+                # two threads share a timestamp to exercise the id tiebreak
+                last_activity=now - datetime.timedelta(minutes=i // 2)
+            ) for i in range(7)
+        ]
+        for i in range(5):
+            ThreadResponse.objects.create(
+                thread=cls.threads[0],
+                creator=forum_user,
+                message='response%d' % i,
+                created_datetime=now
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def walk(self, url, **params):
+        names, pages = [], []
+        response = self.client.get(url, params)
+        while True:
+            pages.append(response.json())
+            names.extend(row.get('name', row.get('message'))
+                         for row in pages[-1]['results'])
+            if pages[-1]['next'] is None:
+                return names, pages
+            response = self.client.get(pages[-1]['next'])
+
+    def test_forum_threads_pages(self):
+        url = reverse('rest-forum-threads', kwargs={'pk': self.forum.pk})
+        names, pages = self.walk(url, page_size=2)
+
+        expected = list(Thread.objects.filter(forum=self.forum).order_by(
+            '-pinned', '-last_activity', '-id'
+        ).values_list('name', flat=True))
+        self.assertEqual(names, expected)
+        self.assertEqual(names[0], 'thread3')
+        self.assertEqual(len(pages), 4)
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_link(self):
+        url = reverse('rest-forum-threads', kwargs={'pk': self.forum.pk})
+        first = self.client.get(url, {'page_size': 3}).json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_thread_responses_pages(self):
+        url = reverse(
+            'rest-thread-responses',
+            kwargs={'pk': self.threads[0].pk}
+        )
+        messages, _ = self.walk(url, page_size=2)
+        self.assertEqual(messages, ['response%d' % i for i in range(5)])
+
+    def test_page_size_is_capped(self):
+        url = reverse('rest-forum-threads', kwargs={'pk': self.forum.pk})
+        response = self.client.get(url, {'page_size': 10 ** 6})
+        self.assertEqual(len(response.json()['results']), 7)
+
+    def test_invalid_cursor(self):
+        url = reverse('rest-forum-threads', kwargs={'pk': self.forum.pk})
+        response = self.client.get(url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_null_cursor(self):
+        url = reverse('rest-forum-threads', kwargs={'pk': self.forum.pk})
+        for cursor in ([0, [None, None, None]], [0, [True, None, 1]]):
+            response = self.client.get(url, {'cursor': encode_cursor(cursor)})
+            self.assertEqual(response.status_code, 404)
+
+    def test_seek_starts_range_scan_at_cursor(self):
+        pagination = ResponseCursorPagination()
+        ordering = pagination.ordering
+        queryset = ThreadResponse.objects.filter(
+            thread=self.threads[0]
+        ).order_by(*ordering).filter(
+            pagination._seek(ordering, [timezone.now(), 1])
+        )
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+
+        # both index columns bound: the scan starts at the cursor, not at
+        # the first response of the thread
+        self.assertIn('(thread_id=? AND created_datetime>?)', plan)
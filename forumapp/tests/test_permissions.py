@@ -0,0 +1,218 @@
+import datetime
+
+from django.contrib.auth.models import User, Permission
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.authentication import token_cache
+from forumapp.models import ForumSection, Forum, ForumUser, Thread
+from forumapp.permissions import ban_cache, banned_until
+
+
+class BanCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='bans')
+        cls.forum = Forum.objects.create(name='bans', section=section)
+        cls.forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='poster')
+        )
+        moderator = User.objects.create_user(username='moderator')
+        moderator.user_permissions.add(
+            Permission.objects.get(codename='can_ban_users')
+        )
+        cls.moderator = moderator
+
+    def setUp(self):
+        ban_cache.clear()
+        self.client = APIClient()
+        # a session loads a fresh user, and its ForumUser, every request
+        self.client.force_login(self.forum_user.user)
+
+    def post_thread(self):
+        return self.client.post(reverse('thread-list'), {
+            'name': 'thread',
+            'forum': self.forum.pk,
+            'message': 'message'
+        })
+
+    def test_ban_status_is_cached(self):
+        self.assertEqual(self.post_thread().status_code, 201)
+        self.assertIn(self.forum_user.user_id, ban_cache._data)
+
+    def test_ban_applies_immediately(self):
+        self.assertEqual(self.post_thread().status_code, 201)
+
+        moderator = APIClient()
+        moderator.force_authenticate(self.moderator)
+        response = moderator.put(
+            reverse('rest-ban-user', kwargs={'pk': self.forum_user.pk}),
+            {
+                'banned_until': datetime.datetime.now() +
+                datetime.timedelta(days=1)
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.post_thread().status_code, 403)
+
+
+class RequestForumUserTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='scoped')
+        cls.forum = Forum.objects.create(name='scoped', section=section)
+        user = User.objects.create_user(username='scoped', password='pass')
+        cls.forum_user = ForumUser.objects.create(user=user)
+        cls.token = Token.objects.create(user=user)
+
+    def setUp(self):
+        ban_cache.clear()
+        token_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def forum_user_queries(self, method, *args):
+        with CaptureQueriesContext(connection) as context:
+            response = method(*args)
+
+        return response, [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and
+            'FROM "forumapp_forumuser"' in query['sql']
+        ]
+
+    def test_create_thread_reuses_forum_user(self):
+        self.client.post(reverse('thread-list'), {
+            'name': 'warm up the ban cache',
+            'forum': self.forum.pk,
+            'message': 'message'
+        })
+
+        response, queries = self.forum_user_queries(
+            self.client.post,
+            reverse('thread-list'),
+            {'name': 'thread', 'forum': self.forum.pk, 'message': 'message'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(queries, [])
+
+    def test_update_checks_owner_without_lookup(self):
+        thread = Thread.objects.create(
+            name='thread',
+            forum=self.forum,
+            creator=self.forum_user
+        )
+        banned_until(self.forum_user.user)
+
+        response, queries = self.forum_user_queries(
+            self.client.put,
+            reverse('thread-detail', kwargs={'pk': thread.pk}),
+            {'message': 'edited'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_read_skips_forum_user(self):
+        self.client.credentials()
+        self.client.force_login(self.forum_user.user)
+
+        response, queries = self.forum_user_queries(
+            self.client.get,
+            reverse('thread-list')
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_ban_applies_to_cached_token(self):
+        self.client.post(reverse('thread-list'), {
+            'name': 'warm up the token cache',
+            'forum': self.forum.pk,
+            'message': 'message'
+        })
+
+        # banned by another process, whose forget_ban did not reach this
+        # one; the ban cache entry expires
+        ForumUser.objects.filter(pk=self.forum_user.pk).update(
+            banned_until=datetime.datetime.now() + datetime.timedelta(days=1)
+        )
+        ban_cache.clear()
+
+        response = self.client.post(reverse('thread-list'), {
+            'name': 'thread',
+            'forum': self.forum.pk,
+            'message': 'message'
+        })
+        self.assertEqual(response.status_code, 403)
+
+    def test_obtain_token(self):
+        response = APIClient().post(reverse('rest-api-token-auth'), {
+            'username': 'scoped',
+            'password': 'pass'
+        })
+        self.assertEqual(response.json(), {
+            'token': self.token.key,
+            'user_id': self.forum_user.id,
+            'username': 'scoped'
+        })
+
+    def test_obtain_token_without_forum_user(self):
+        User.objects.create_user(username='admin only', password='pass')
+        response = APIClient().post(reverse('rest-api-token-auth'), {
+            'username': 'admin only',
+            'password': 'pass'
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Token.objects.filter(
+            user__username='admin only'
+        ).exists())
+
+
+class CachingTokenAuthenticationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='cached')
+        ForumUser.objects.create(user=user)
+        cls.token = Token.objects.create(user=user)
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    def setUp(self):
+        token_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_warm_token_skips_database(self):
+        self.client.get(reverse('rest-likedislike-bulk'), {'responses[]': 1})
+
+        # only the vote lookup itself is left
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('rest-likedislike-bulk'),
+                {'responses[]': 1}
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout_evicts_token(self):
+        self.assertEqual(
+            self.client.post(reverse('rest-logout')).status_code,
+            200
+        )
+        response = self.client.get(
+            reverse('rest-likedislike-bulk'),
+            {'responses[]': 1}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_stats_are_staff_only(self):
+        url = reverse('rest-auth-cache-stats')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        stats = self.client.get(url).json()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
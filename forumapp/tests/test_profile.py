@@ -0,0 +1,84 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse
+
+
+class UserProfileTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='profile')
+        cls.forum = Forum.objects.create(name='profile', section=section)
+        cls.forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='profile')
+        )
+        cls.thread = Thread.objects.create(
+            name='thread',
+            forum=cls.forum,
+            creator=cls.forum_user
+        )
+        cls.responses = [
+            ThreadResponse.objects.create(
+                thread=cls.thread,
+                creator=cls.forum_user,
+                message='response%d' % i
+            ) for i in range(15)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_counts_and_first_page(self):
+        # user, two counts, two first pages
+        with self.assertNumQueries(5):
+            response = self.client.get(
+                reverse('forumuser-detail', kwargs={'pk': self.forum_user.pk})
+            )
+        profile = response.json()
+
+        self.assertEqual(profile['username'], 'profile')
+        self.assertEqual(profile['thread_count'], 1)
+        self.assertEqual(profile['response_count'], 15)
+        self.assertNotIn('user_responses', profile)
+        self.assertEqual(
+            [row['id'] for row in profile['recent_responses']['results']],
+            [response.pk for response in reversed(self.responses[5:])]
+        )
+        latest = profile['recent_responses']['results'][0]
+        del latest['created_datetime']
+        self.assertEqual(latest, {
+            'id': self.responses[-1].pk,
+            'thread': self.thread.pk,
+            'forum': self.forum.pk,
+            'position': 15
+        })
+        self.assertIsNone(profile['recent_threads']['next'])
+
+        following = self.client.get(
+            profile['recent_responses']['next']
+        ).json()
+        self.assertEqual(
+            [row['id'] for row in following['results']],
+            [response.pk for response in reversed(self.responses[:5])]
+        )
+        self.assertIsNone(following['next'])
+
+    def test_user_view(self):
+        profile = self.client.get(
+            reverse('user-view', kwargs={'pk': self.forum_user.pk})
+        ).json()
+        self.assertEqual(profile['viewed_user'], 'profile')
+        self.assertEqual(profile['response_count'], 15)
+
+    def test_user_threads(self):
+        response = self.client.get(
+            reverse('rest-user-threads', kwargs={'pk': self.forum_user.pk})
+        )
+        self.assertEqual(response.data['results'][0]['name'], 'thread')
+
+    def test_unknown_user(self):
+        response = self.client.get(reverse('user-view', kwargs={'pk': 0}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,155 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.checks import check_shared_cache
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse
+
+
+class ResponseCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='cached')
+        cls.forum = Forum.objects.create(name='cached', section=section)
+        cls.user = User.objects.create_user(username='cached')
+        cls.forum_user = ForumUser.objects.create(user=cls.user)
+        cls.thread = Thread.objects.create(
+            name='thread',
+            forum=cls.forum,
+            creator=cls.forum_user
+        )
+        cls.response = ThreadResponse.objects.create(
+            thread=cls.thread,
+            creator=cls.forum_user,
+            message='first'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.responses_url = reverse(
+            'rest-thread-responses',
+            kwargs={'pk': self.thread.pk}
+        )
+        self.threads_url = reverse(
+            'rest-forum-threads',
+            kwargs={'pk': self.forum.pk}
+        )
+
+    def test_hit_skips_queries(self):
+        for url in (
+            self.responses_url,
+            self.threads_url,
+            reverse('thread-detail', kwargs={'pk': self.thread.pk}),
+            reverse('thread-list'),
+            reverse('forum-list'),
+        ):
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(second.content, first.content)
+            self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'mirror.example.com'])
+    def test_links_follow_host_and_scheme(self):
+        ThreadResponse.objects.create(
+            thread=self.thread,
+            creator=self.forum_user,
+            message='second'
+        )
+        self.client.get(self.responses_url, {'page_size': 1})
+
+        response = self.client.get(
+            self.responses_url,
+            {'page_size': 1},
+            HTTP_HOST='mirror.example.com',
+            secure=True
+        )
+        self.assertTrue(response.json()['next'].startswith(
+            'https://mirror.example.com/'
+        ))
+
+    def test_not_modified_from_cache(self):
+        etag = self.client.get(self.responses_url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.responses_url,
+                HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_authenticated_not_cached(self):
+        self.client.force_authenticate(self.user)
+        self.client.get(self.responses_url)
+        # version, thread and the responses
+        with self.assertNumQueries(3):
+            self.client.get(self.responses_url)
+
+    def test_reply_bumps_generation(self):
+        self.client.get(self.responses_url)
+        self.client.get(reverse('forum-list'))
+
+        writer = APIClient()
+        writer.force_authenticate(self.user)
+        writer.post(
+            reverse('threadresponse-list'),
+            {'thread': self.thread.pk, 'message': 'second'}
+        )
+
+        self.assertEqual(
+            len(self.client.get(self.responses_url).json()['results']),
+            2
+        )
+        # listings across forums follow every bump
+        with self.assertNumQueries(1):
+            self.client.get(reverse('forum-list'))
+
+    def test_vote_bumps_generation(self):
+        self.client.get(self.responses_url)
+
+        voter = APIClient()
+        voter.force_authenticate(self.user)
+        voter.post(
+            reverse('rest-likedislike', kwargs={'pk': self.response.pk}),
+            {'like': 'true'}
+        )
+
+        result = self.client.get(self.responses_url).json()['results'][0]
+        self.assertEqual(result['likes'], 1)
+
+    def test_pin_and_delete_bump_generation(self):
+        detail_url = reverse('thread-detail', kwargs={'pk': self.thread.pk})
+        self.client.get(self.threads_url)
+        self.client.get(detail_url)
+
+        thread = Thread.objects.get(pk=self.thread.pk)
+        thread.pinned = True
+        thread.save()
+        self.assertTrue(
+            self.client.get(self.threads_url).json()['results'][0]['pinned']
+        )
+
+        thread.delete()
+        self.assertEqual(self.client.get(detail_url).status_code, 404)
+
+
+class SharedCacheCheckTest(TestCase):
+    @override_settings(DEBUG=False, CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+    }})
+    def test_warns_about_process_local_cache(self):
+        self.assertEqual(
+            [warning.id for warning in check_shared_cache(None)],
+            ['forumapp.W001']
+        )
+
+    @override_settings(DEBUG=False, CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+    }})
+    def test_shared_cache(self):
+        self.assertEqual(check_shared_cache(None), [])
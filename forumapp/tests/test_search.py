@@ -0,0 +1,166 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models.sql import DeleteQuery
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp import search
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='search')
+        cls.forum = Forum.objects.create(name='search', section=section)
+        cls.other_forum = Forum.objects.create(name='other', section=section)
+        cls.forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='search')
+        )
+        cls.thread = Thread.objects.create(
+            name='Gearbox repair',
+            message='my car makes a noise',
+            forum=cls.forum,
+            creator=cls.forum_user
+        )
+        cls.response = ThreadResponse.objects.create(
+            thread=cls.thread,
+            creator=cls.forum_user,
+            message='check the gearbox oil <b>first</b>'
+        )
+        cls.other_thread = Thread.objects.create(
+            name='Bikes',
+            message='my bike gearbox is stuck',
+            forum=cls.other_forum,
+            creator=cls.forum_user
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('rest-search')
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def matches(self, data):
+        return [(result['kind'], result['id']) for result in data['results']]
+
+    def test_names_rank_first(self):
+        data = self.search(q='gearbox')
+        self.assertEqual(data['results'][0]['id'], self.thread.pk)
+        self.assertEqual(len(data['results']), 3)
+
+    def test_forum_filter(self):
+        data = self.search(q='gearbox', forum=self.other_forum.pk)
+        self.assertEqual(self.matches(data), [('thread', self.other_thread.pk)])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        data = self.search(q='oil')
+        self.assertEqual(
+            data['results'][0]['snippet'],
+            'check the gearbox <mark>oil</mark> &lt;b&gt;first&lt;/b&gt;'
+        )
+
+    def test_query_syntax_is_not_interpreted(self):
+        data = self.search(q='"gearbox* -(')
+        self.assertEqual(len(data['results']), 3)
+
+    def test_empty_query(self):
+        response = self.client.get(self.url, {'q': '!?'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pagination(self):
+        first = self.search(q='gearbox', page_size=2)
+        self.assertEqual(len(first['results']), 2)
+
+        second = self.client.get(first['next']).data
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            set(self.matches(first)) | set(self.matches(second)),
+            {
+                ('thread', self.thread.pk),
+                ('response', self.response.pk),
+                ('thread', self.other_thread.pk),
+            }
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'q': 'gearbox', 'cursor': 'x'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_edit_and_delete_update_index(self):
+        self.response.message = 'try the clutch'
+        self.response.save()
+        self.assertEqual(self.matches(self.search(q='clutch')),
+                         [('response', self.response.pk)])
+
+        Thread.objects.get(pk=self.thread.pk).delete()
+        self.assertEqual(self.search(q='clutch')['results'], [])
+        self.assertEqual(self.matches(self.search(q='gearbox')),
+                         [('thread', self.other_thread.pk)])
+
+    def test_thread_delete_unindexes_in_one_statement(self):
+        for i in range(3):
+            ThreadResponse.objects.create(
+                thread=self.thread,
+                creator=self.forum_user,
+                message='gearbox %d' % i
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            Thread.objects.get(pk=self.thread.pk).delete()
+        self.assertEqual(len([
+            query for query in queries.captured_queries
+            if query['sql'].startswith('DELETE FROM forumapp_search')
+        ]), 1)
+        self.assertEqual(self.matches(self.search(q='gearbox')),
+                         [('thread', self.other_thread.pk)])
+
+    def test_failed_thread_delete_keeps_unindexing(self):
+        with self.assertRaises(OperationalError):
+            with transaction.atomic(), mock.patch.object(
+                    DeleteQuery,
+                    'delete_batch',
+                    side_effect=OperationalError('database is locked')
+            ):
+                Thread.objects.get(pk=self.thread.pk).delete()
+
+        ThreadResponse.objects.get(pk=self.response.pk).delete()
+        self.assertNotIn(('response', self.response.pk),
+                         self.matches(self.search(q='gearbox')))
+
+    def test_failed_rebuild_keeps_index(self):
+        with mock.patch(
+                'forumapp.search.response_row',
+                side_effect=OperationalError('database is locked')
+        ), self.assertRaises(OperationalError):
+            search.rebuild(batch_size=1)
+
+        self.assertEqual(len(self.search(q='gearbox')['results']), 3)
+
+    def test_available_only_with_fts5(self):
+        self.addCleanup(delattr, connection, '_forumapp_fts5')
+        del connection._forumapp_fts5
+        with mock.patch(
+                'forumapp.search._has_fts5',
+                return_value=False
+        ) as probe:
+            response = self.client.get(self.url, {'q': 'gearbox'})
+            self.assertFalse(search.search_available())
+
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(probe.call_count, 1)
+
+    def test_rebuild(self):
+        search.unindex(search.THREAD, self.thread.pk)
+        call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+        self.assertEqual(len(self.search(q='gearbox')['results']), 3)
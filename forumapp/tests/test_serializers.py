@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse
+
+
+class CompactSerializersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='section1')
+        cls.forum = Forum.objects.create(
+            name='Compact',
+            description='Desc1',
+            section=section
+        )
+        Forum.objects.create(name='Empty', description='', section=section)
+        forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='compact')
+        )
+        cls.threads = []
+        for i in range(3):
+            thread = Thread.objects.create(
+                name='thread%d' % i,
+                forum=cls.forum,
+                message='message',
+                creator=forum_user
+            )
+            for _ in range(i):
+                ThreadResponse.objects.create(
+                    thread=thread,
+                    creator=forum_user,
+                    message='response'
+                )
+            cls.threads.append(thread)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_thread_list_is_compact(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('thread-list'))
+
+        counts = {row['name']: row['response_count'] for row in response.json()}
+        self.assertEqual(counts, {'thread0': 0, 'thread1': 1, 'thread2': 2})
+        self.assertNotIn('threadresponse_set', response.json()[0])
+
+    def test_thread_list_with_ids(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('thread-list'),
+                {'include_ids': 'true'}
+            )
+
+        ids = {row['name']: row['threadresponse_set']
+               for row in response.json()}
+        self.assertEqual(len(ids['thread2']), 2)
+
+    def test_forum_list_is_compact(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('forum-list'))
+
+        forums = {row['name']: row for row in response.json()}
+        self.assertEqual(forums['Compact']['thread_count'], 3)
+        self.assertIsNotNone(forums['Compact']['last_activity'])
+        self.assertEqual(forums['Empty']['thread_count'], 0)
+        self.assertIsNone(forums['Empty']['last_activity'])
+        self.assertNotIn('thread_set', forums['Compact'])
+
+    def test_forum_threads_counts(self):
+        response = self.client.get(
+            reverse('rest-forum-threads', kwargs={'pk': self.forum.pk})
+        )
+        counts = [row['response_count'] for row in response.json()['results']]
+        self.assertEqual(sorted(counts), [0, 1, 2])
@@ -0,0 +1,115 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse
+from forumapp.timing import endpoint_samples, _percentiles
+
+
+def server_timing(response):
+    return dict(
+        re.match(r'(\w+);dur=([\d.]+)', entry).groups()
+        for entry in response['Server-Timing'].split(', ')
+    )
+
+
+class TimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='timed')
+        cls.forum = Forum.objects.create(name='timed', section=section)
+        cls.forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='timed')
+        )
+        cls.thread = Thread.objects.create(
+            name='thread',
+            forum=cls.forum,
+            creator=cls.forum_user
+        )
+        ThreadResponse.objects.create(
+            thread=cls.thread,
+            creator=cls.forum_user,
+            message='first'
+        )
+        cls.admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='pass'
+        )
+
+    def setUp(self):
+        cache.clear()
+        endpoint_samples.clear()
+        self.client = APIClient()
+        self.responses_url = reverse(
+            'rest-thread-responses',
+            kwargs={'pk': self.thread.pk}
+        )
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.responses_url)
+
+        self.assertIn(
+            'desc="%d queries"' % len(queries),
+            response['Server-Timing']
+        )
+        durations = server_timing(response)
+        self.assertEqual(
+            set(durations),
+            {'sql', 'serializer', 'template', 'total'}
+        )
+        self.assertGreater(float(durations['serializer']), 0)
+        self.assertEqual(float(durations['template']), 0)
+
+    def test_template_time(self):
+        response = self.client.get(reverse('forums'))
+        self.assertGreater(float(server_timing(response)['template']), 0)
+
+    def test_log_line(self):
+        with self.assertLogs('forumapp.timing', 'INFO') as logs:
+            self.client.get(self.responses_url)
+
+        self.assertIn('url_name=rest-thread-responses', logs.output[0])
+        self.assertEqual(logs.records[0].url_name, 'rest-thread-responses')
+        self.assertGreater(logs.records[0].queries, 0)
+
+    def test_stats(self):
+        for _ in range(3):
+            self.client.get(self.responses_url)
+
+        self.client.force_authenticate(self.admin)
+        stats = self.client.get(reverse('rest-timings')).json()
+        endpoint = stats['rest-thread-responses']
+        self.assertEqual(endpoint['count'], 3)
+        self.assertEqual(
+            set(endpoint['total_ms']),
+            {'p50', 'p95', 'p99'}
+        )
+        # only the first request missed the response cache
+        self.assertEqual(endpoint['queries']['p50'], 0)
+        self.assertGreater(endpoint['queries']['p99'], 0)
+
+    def test_stats_staff_only(self):
+        self.client.force_authenticate(self.forum_user.user)
+        self.assertEqual(
+            self.client.get(reverse('rest-timings')).status_code,
+            403
+        )
+
+    def test_percentiles(self):
+        self.assertEqual(
+            _percentiles(list(range(1, 101))),
+            {'p50': 50, 'p95': 95, 'p99': 99}
+        )
+        self.assertEqual(
+            _percentiles([7]),
+            {'p50': 7, 'p95': 7, 'p99': 7}
+        )
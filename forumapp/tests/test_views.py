@@ -1,6 +1,12 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-from forumapp.models import Forum
+from forumapp.models import Forum, ForumSection, ForumUser, Thread, \
+    ThreadResponse
 
 
 class ForumSectionViewTest(TestCase):
@@ -16,3 +22,176 @@ class ForumViewTest(TestCase):
 
 
 
+
+
+class ForumsPageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        forum_user = ForumUser.objects.create(
+            user=User.objects.create_user(username='forums')
+        )
+        for i in range(3):
+            section = ForumSection.objects.create(name='section%d' % i)
+            for j in range(3):
+                forum = Forum.objects.create(
+                    name='forum%d%d' % (i, j),
+                    section=section
+                )
+                thread = Thread.objects.create(
+                    name='thread%d%d' % (i, j),
+                    forum=forum,
+                    creator=forum_user
+                )
+                ThreadResponse.objects.create(
+                    thread=thread,
+                    creator=forum_user
+                )
+        ForumSection.objects.create(name='empty')
+
+    def test_constant_queries(self):
+        # sections and annotated forums, however many there are
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('forums'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'thread21')
+        self.assertContains(response, 'EMPTY')
+
+        forum = response.context['sections'][1].forums[2]
+        self.assertEqual(
+            (forum.name, forum.thread_count, forum.response_count,
+             forum.latest_thread_name),
+            ('forum12', 1, 1, 'thread12')
+        )
+
+
+class ThreadPageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='thread page')
+        cls.forum = Forum.objects.create(name='thread page', section=section)
+        cls.user = User.objects.create_user(username='reader')
+        creator = ForumUser.objects.create(user=cls.user)
+        cls.thread = Thread.objects.create(
+            name='thread',
+            forum=cls.forum,
+            creator=creator
+        )
+        for i in range(13):
+            # a different author for every response
+            ThreadResponse.objects.create(
+                thread=cls.thread,
+                creator=ForumUser.objects.create(
+                    user=User.objects.create_user(username='author%d' % i)
+                ) if i else creator,
+                message='response%d' % i
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, page):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('thread-view', args=[self.forum.pk, self.thread.pk]),
+                {'page': page}
+            )
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_constant_queries(self):
+        self.client.force_login(self.user)
+        full, full_queries = self.get_page(1)
+        partial, partial_queries = self.get_page(2)
+
+        self.assertEqual(full_queries, partial_queries)
+        self.assertContains(full, 'author9')
+        self.assertContains(partial, 'author12')
+        self.assertEqual(
+            [response.can_edit for response in full.context['response_list']],
+            [True] + [False] * 9
+        )
+        self.assertFalse(full.context['response_list'][0].can_remove)
+
+    def test_unknown_thread(self):
+        url = reverse('thread-view', args=[self.forum.pk + 1, self.thread.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class FragmentCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='cached')
+        cls.forum = Forum.objects.create(name='cached', section=section)
+        cls.user = User.objects.create_user(username='cached')
+        cls.forum_user = ForumUser.objects.create(user=cls.user)
+        cls.thread = Thread.objects.create(
+            name='cached thread',
+            forum=cls.forum,
+            creator=cls.forum_user
+        )
+        cls.response = ThreadResponse.objects.create(
+            thread=cls.thread,
+            creator=cls.forum_user,
+            message='original'
+        )
+        cls.reply = ThreadResponse.objects.create(
+            thread=cls.thread,
+            creator=cls.forum_user,
+            message='reply'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.thread_url = reverse(
+            'thread-view',
+            args=[self.forum.pk, self.thread.pk]
+        )
+        self.forum_url = reverse('forum', args=[self.forum.pk])
+
+    def test_rows_follow_thread_version(self):
+        self.assertContains(self.client.get(self.thread_url), 'original')
+
+        # a bare UPDATE bumps no version, so the cached row is served
+        ThreadResponse.objects.filter(pk=self.response.pk).update(
+            message='silent'
+        )
+        self.assertContains(self.client.get(self.thread_url), 'original')
+
+        response = ThreadResponse.objects.get(pk=self.response.pk)
+        response.message = 'edited'
+        response.save()
+        self.assertContains(self.client.get(self.thread_url), 'edited')
+
+    def test_controls_are_not_cached(self):
+        self.assertNotContains(self.client.get(self.thread_url), 'Edit')
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(self.thread_url), 'Edit')
+
+    def test_thread_list_follows_reply_edits(self):
+        self.assertContains(self.client.get(self.forum_url), 'reply')
+        reply = ThreadResponse.objects.get(pk=self.reply.pk)
+        reply.message = 'edited'
+        reply.save()
+        self.assertContains(self.client.get(self.forum_url), 'edited')
+
+    def test_opening_post_is_not_a_reply(self):
+        ThreadResponse.objects.get(pk=self.reply.pk).delete()
+        response = self.client.get(self.forum_url)
+        self.assertContains(response, '<td>0</td>', html=False)
+        self.assertContains(response, 'No responses')
+
+    def test_thread_list_follows_forum_version(self):
+        with CaptureQueriesContext(connection) as miss:
+            self.assertContains(self.client.get(self.forum_url), 'reply')
+        with CaptureQueriesContext(connection) as hit:
+            self.assertContains(self.client.get(self.forum_url), 'reply')
+        self.assertEqual(len(hit), len(miss) - 1)
+
+        thread = Thread.objects.get(pk=self.thread.pk)
+        thread.pinned = True
+        thread.save()
+        self.assertContains(
+            self.client.get(self.forum_url),
+            'class="pinned clickable-row"'
+        )
@@ -0,0 +1,406 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from forumapp.models import ForumSection, Forum, ForumUser, Thread, \
+    ThreadResponse, LikeDislike, ContentVersion
+from forumapp.votes import vote_buffer, toggle_vote, atomic_votes, \
+    _toggle_vote_orm, VoteBuffer
+
+
+class VoteCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        section = ForumSection.objects.create(name='section1')
+        forum = Forum.objects.create(
+            name='Forum1',
+            description='Desc1',
+            section=section
+        )
+        user = User.objects.create_user(
+            username='testuser',
+            password='zaq12wrx'
+        )
+        cls.forum_user = ForumUser.objects.create(user=user)
+        thread = Thread.objects.create(
+            name='thread1',
+            forum=forum,
+            message='message1',
+            creator=cls.forum_user
+        )
+        cls.response = ThreadResponse.objects.create(
+            thread=thread,
+            creator=cls.forum_user,
+            message='response1'
+        )
+
+    def setUp(self):
+        # the trigger check runs once per connection, outside the counts
+        atomic_votes(connection)
+        self.client = APIClient()
+        self.client.force_authenticate(self.forum_user.user)
+
+    def vote(self, like):
+        return self.client.post(
+            reverse('rest-likedislike', kwargs={'pk': self.response.pk}),
+            {'like': 'true' if like else 'false'}
+        )
+
+    def test_vote_toggles_update_counters(self):
+        self.assertEqual(self.vote(True).status_code, 201)
+        self.response.refresh_from_db()
+        self.assertEqual((self.response.likes, self.response.dislikes), (1, 0))
+
+        self.assertEqual(self.vote(False).status_code, 200)
+        self.response.refresh_from_db()
+        self.assertEqual((self.response.likes, self.response.dislikes), (0, 1))
+
+        self.assertEqual(self.vote(False).status_code, 200)
+        self.response.refresh_from_db()
+        self.assertEqual((self.response.likes, self.response.dislikes), (0, 0))
+
+    def test_vote_returns_score(self):
+        self.assertEqual(self.vote(True).json()['score'], 1)
+        self.assertEqual(self.vote(False).json()['score'], -1)
+        self.assertEqual(self.vote(False).json(), {
+            'like': None,
+            'response': self.response.pk,
+            'score': 0
+        })
+
+    def test_toggle_statements(self):
+        # the savepoint pair only exists because tests run in a transaction
+        with self.assertNumQueries(4):
+            self.assertEqual(
+                toggle_vote(self.forum_user.pk, self.response.pk, True),
+                (None, True, 1, self.response.thread_id)
+            )
+        with self.assertNumQueries(4):
+            self.assertEqual(
+                toggle_vote(self.forum_user.pk, self.response.pk, False),
+                (True, False, -1, self.response.thread_id)
+            )
+        with self.assertNumQueries(3):
+            self.assertEqual(
+                toggle_vote(self.forum_user.pk, self.response.pk, False),
+                (False, None, 0, self.response.thread_id)
+            )
+        self.assertIsNone(toggle_vote(self.forum_user.pk, 999, True))
+        self.assertFalse(LikeDislike.objects.exists())
+
+    @mock.patch('forumapp.votes.atomic_votes', return_value=False)
+    def test_toggle_without_returning(self, atomic_votes):
+        key = ContentVersion.thread_key(self.response.thread_id)
+        version, _ = ContentVersion.lookup(key)
+        self.assertEqual(
+            toggle_vote(self.forum_user.pk, self.response.pk, True),
+            (None, True, 1, self.response.thread_id)
+        )
+        self.assertEqual(
+            toggle_vote(self.forum_user.pk, self.response.pk, False),
+            (True, False, -1, self.response.thread_id)
+        )
+        self.assertEqual(
+            toggle_vote(self.forum_user.pk, self.response.pk, False),
+            (False, None, 0, self.response.thread_id)
+        )
+        self.assertIsNone(toggle_vote(self.forum_user.pk, 999, True))
+
+        self.response.refresh_from_db()
+        self.assertEqual((self.response.likes, self.response.dislikes), (0, 0))
+        self.assertFalse(LikeDislike.objects.exists())
+        self.assertGreater(ContentVersion.lookup(key)[0], version)
+
+    def test_toggle_without_triggers(self):
+        self.addCleanup(delattr, connection, '_forumapp_vote_triggers')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER forumapp_likedislike_update')
+        del connection._forumapp_vote_triggers
+
+        with mock.patch(
+                'forumapp.votes._toggle_vote_orm',
+                wraps=_toggle_vote_orm
+        ) as orm:
+            toggle_vote(self.forum_user.pk, self.response.pk, True)
+            toggle_vote(self.forum_user.pk, self.response.pk, False)
+
+        self.assertEqual(orm.call_count, 2)
+        self.response.refresh_from_db()
+        self.assertEqual((self.response.likes, self.response.dislikes), (0, 1))
+
+    def test_vote_reads_thread_from_returning(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.vote(True)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query['sql'].startswith(
+                'SELECT "forumapp_threadresponse"."thread_id"'
+            )
+        ])
+
+    def test_vote_bumps_thread_version(self):
+        key = ContentVersion.thread_key(self.response.thread_id)
+        version, _ = ContentVersion.lookup(key)
+        self.vote(True)
+        self.assertEqual(ContentVersion.lookup(key)[0], version + 1)
+
+    def test_vote_unknown_response(self):
+        response = self.client.post(
+            reverse('rest-likedislike', kwargs={'pk': 999}),
+            {'like': 'true'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_only_forum_users_vote(self):
+        self.client.force_authenticate(
+            User.objects.create_user(username='no forum user')
+        )
+        response = self.client.post(
+            reverse('rest-likedislike', kwargs={'pk': self.response.pk}),
+            {'like': 'true'}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(len(vote_buffer))
+
+    def test_serializer_exposes_counters(self):
+        self.vote(True)
+        response = self.client.get(
+            reverse('threadresponse-detail', kwargs={'pk': self.response.pk})
+        )
+        self.assertEqual(response.data['likes'], 1)
+        self.assertEqual(response.data['dislikes'], 0)
+
+    def test_recount_votes_command(self):
+        LikeDislike.objects.create(
+            user=self.forum_user,
+            response=self.response,
+            like=False
+        )
+        call_command('recount_votes', stdout=StringIO())
+        self.response.refresh_from_db()
+        self.assertEqual((self.response.likes, self.response.dislikes), (0, 1))
+
+    def test_bulk_vote_state(self):
+        other = ThreadResponse.objects.create(
+            thread=self.response.thread,
+            creator=self.forum_user,
+            message='response2'
+        )
+        self.vote(False)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('rest-likedislike-bulk'),
+                {'responses[]': [self.response.pk, other.pk]}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            str(self.response.pk): -1,
+            str(other.pk): 0
+        })
+
+    def test_bulk_vote_state_invalid_ids(self):
+        response = self.client.get(
+            reverse('rest-likedislike-bulk'),
+            {'responses[]': ['abc']}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(FORUMAPP_VOTE_WRITE_BEHIND=True)
+@mock.patch.object(vote_buffer, 'interval', 0)
+class BufferedVoteTest(VoteCountersTest):
+    """
+    Runs the vote tests with the write-behind buffer, flushing before
+    anything is read from the database.
+    """
+
+    def setUp(self):
+        super(BufferedVoteTest, self).setUp()
+        self.addCleanup(vote_buffer.flush)
+
+    def vote(self, like):
+        response = super(BufferedVoteTest, self).vote(like)
+        self.assertTrue(len(vote_buffer))
+        vote_buffer.flush()
+        return response
+
+    def test_reads_see_buffered_votes(self):
+        super(BufferedVoteTest, self).vote(True)
+        super(BufferedVoteTest, self).vote(False)
+        self.assertFalse(LikeDislike.objects.exists())
+
+        response = self.client.get(
+            reverse('threadresponse-detail', kwargs={'pk': self.response.pk})
+        )
+        self.assertEqual(
+            (response.data['likes'], response.data['dislikes']),
+            (0, 1)
+        )
+        votes = self.client.get(
+            reverse('rest-likedislike-bulk'),
+            {'responses[]': [self.response.pk]}
+        ).json()
+        self.assertEqual(votes, {str(self.response.pk): -1})
+
+    def test_page_takes_one_delta_snapshot(self):
+        for message in ('response2', 'response3'):
+            ThreadResponse.objects.create(
+                thread=self.response.thread,
+                creator=self.forum_user,
+                message=message
+            )
+        super(BufferedVoteTest, self).vote(True)
+
+        with mock.patch.object(
+            vote_buffer,
+            'deltas',
+            wraps=vote_buffer.deltas
+        ) as deltas:
+            response = self.client.get(reverse(
+                'rest-thread-responses',
+                kwargs={'pk': self.response.thread_id}
+            ))
+
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertEqual(deltas.call_count, 1)
+
+    def test_flush_coalesces_toggles(self):
+        for like in (True, False, False, True):
+            super(BufferedVoteTest, self).vote(like)
+
+        with self.assertNumQueries(6):
+            # users, responses, savepoint, delete, insert, release
+            self.assertEqual(vote_buffer.flush(), 1)
+
+        vote = LikeDislike.objects.get()
+        self.assertTrue(vote.like)
+        self.response.refresh_from_db()
+        self.assertEqual((self.response.likes, self.response.dislikes), (1, 0))
+
+    def test_flush_bumps_response_cache(self):
+        super(BufferedVoteTest, self).vote(True)
+        with mock.patch('forumapp.votes.bump_generations') as bump:
+            vote_buffer.flush()
+
+        bump.assert_called_once_with(
+            ContentVersion.thread_key(self.response.thread_id)
+        )
+
+    @mock.patch('forumapp.votes.atomic_votes', return_value=False)
+    def test_flush_recounts_without_triggers(self, atomic_votes):
+        super(BufferedVoteTest, self).vote(False)
+        vote_buffer.flush()
+
+        self.response.refresh_from_db()
+        self.assertEqual((self.response.likes, self.response.dislikes), (0, 1))
+
+
+class VoteBufferTest(SimpleTestCase):
+    def setUp(self):
+        # buffers flush when the interpreter exits, the test database is
+        # gone by then
+        patcher = mock.patch('forumapp.writebehind.atexit')
+        self.atexit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_flushes_at_exit_without_interval(self):
+        buffer = VoteBuffer(interval=0)
+        buffer.write = mock.Mock()
+        buffer.toggle((1, 1), True, lambda: None)
+        buffer.toggle((1, 2), True, lambda: None)
+
+        self.atexit.register.assert_called_once_with(buffer._flush_at_exit)
+        buffer._flush_at_exit()
+        buffer.write.assert_called_once_with({
+            (1, 1): (None, True),
+            (1, 2): (None, True)
+        })
+
+    def test_concurrent_toggles_apply_in_turn(self):
+        buffer = VoteBuffer(interval=0)
+        loading = threading.Event()
+
+        def load_stored():
+            loading.set()
+            # the second toggle arrives while the vote is being read
+            time.sleep(0.05)
+            return None
+
+        first = threading.Thread(
+            target=buffer.toggle,
+            args=((1, 1), True, load_stored)
+        )
+        first.start()
+        loading.wait()
+        second = buffer.toggle((1, 1), True, mock.Mock(return_value=None))
+        first.join()
+
+        # like, then like again: the vote is removed
+        self.assertEqual(second, (True, None))
+        self.assertEqual(buffer.get((1, 1)), (None, None))
+
+    def flush_in_background(self, buffer, write):
+        writing, release = threading.Event(), threading.Event()
+
+        def blocked_write(entries):
+            writing.set()
+            release.wait()
+            write(entries)
+
+        def flush():
+            try:
+                buffer.flush()
+            except OperationalError:
+                pass
+
+        buffer.write = blocked_write
+        flusher = threading.Thread(target=flush)
+        flusher.start()
+        writing.wait()
+        return flusher, release
+
+    def test_reads_do_not_wait_for_flush(self):
+        buffer = VoteBuffer(interval=0)
+        buffer.toggle((1, 1), True, lambda: None)
+        flusher, release = self.flush_in_background(buffer, lambda e: None)
+
+        reader = threading.Thread(target=buffer.deltas)
+        reader.start()
+        reader.join(1)
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(buffer.get((1, 1)), (None, True))
+        # toggled again while the like is written
+        self.assertEqual(
+            buffer.toggle((1, 1), True, mock.Mock()),
+            (True, None)
+        )
+        self.assertEqual(buffer.deltas(), {1: (0, 0)})
+
+        release.set()
+        flusher.join()
+        self.assertEqual(buffer.pending(), {(1, 1): (True, None)})
+        self.assertEqual(buffer.deltas(), {1: (-1, 0)})
+
+    def test_failed_flush_merges_back(self):
+        buffer = VoteBuffer(interval=0)
+        buffer.toggle((1, 1), True, lambda: None)
+
+        def fail(entries):
+            raise OperationalError('database is locked')
+
+        flusher, release = self.flush_in_background(buffer, fail)
+        buffer.toggle((1, 1), False, mock.Mock())
+        release.set()
+        flusher.join()
+
+        self.assertEqual(buffer.pending(), {(1, 1): (None, False)})
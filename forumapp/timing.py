@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+# measured parts of a request, in Server-Timing order
+PARTS = ('sql', 'serializer', 'template')
+
+PERCENTILES = (50, 95, 99)
+
+_local = threading.local()
+
+
+class RequestTimings(object):
+    """
+    Time spent in each part of a single request, in seconds.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.durations = dict.fromkeys(PARTS, 0.0)
+        # nesting depth per part, so that nested serializers and templates
+        # are only counted once
+        self.depth = dict.fromkeys(PARTS, 0)
+
+
+def current():
+    """
+    :return RequestTimings of the request handled by this thread, or None
+    """
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def timed(part):
+    """
+    Adds the time spent in the block to `part` of the current request.
+    """
+    timings = current()
+    if timings is None or timings.depth[part]:
+        yield
+        return
+
+    timings.depth[part] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[part] += time.perf_counter() - start
+        timings.depth[part] -= 1
+
+
+def _count_query(execute, sql, params, many, context):
+    timings = current()
+    if timings is not None:
+        timings.queries += 1
+
+    with timed('sql'):
+        return execute(sql, params, many, context)
+
+
+class TimedTemplate(object):
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend that times template rendering.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class EndpointSamples(object):
+    """
+    The most recent samples of every endpoint, by URL name.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, url_name, sample):
+        with self._lock:
+            if url_name not in self._samples:
+                self._samples[url_name] = deque(maxlen=self.size)
+            self._samples[url_name].append(sample)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """
+        :return dict URL name -> number of samples and the percentiles of
+        every measurement
+        """
+        with self._lock:
+            samples = {
+                url_name: list(endpoint)
+                for url_name, endpoint in self._samples.items()
+            }
+
+        summary = {}
+        for url_name, endpoint in samples.items():
+            stats = {'count': len(endpoint)}
+            for measurement in endpoint[0]:
+                stats[measurement] = _percentiles(
+                    [sample[measurement] for sample in endpoint]
+                )
+            summary[url_name] = stats
+
+        return summary
+
+
+def _percentiles(values):
+    """
+    Nearest-rank percentiles of a non-empty list of values.
+    """
+    values = sorted(values)
+    return {
+        'p%d' % percentile:
+            values[max(0, -(-len(values) * percentile // 100) - 1)]
+        for percentile in PERCENTILES
+    }
+
+
+endpoint_samples = EndpointSamples(settings.FORUMAPP_TIMING_SAMPLES)
+
+
+def _milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _server_timing(sample):
+    entries = ['sql;dur=%s;desc="%d queries"' % (
+        sample['sql_ms'],
+        sample['queries']
+    )]
+    entries += [
+        '%s;dur=%s' % (part, sample['%s_ms' % part])
+        for part in PARTS[1:]
+    ]
+    entries.append('total;dur=%s' % sample['total_ms'])
+    return ', '.join(entries)
+
+
+class TimingMiddleware(object):
+    """
+    Counts the queries of every request and measures the time spent in
+    SQL, serializers and templates. The measurements are sent in a
+    Server-Timing header, logged with the URL name of the view and kept
+    per endpoint for the timing statistics endpoint.
+
+    Streaming responses are measured up to the start of the stream.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _local.timings = RequestTimings()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_count_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+
+        sample = {'queries': timings.queries}
+        for part in PARTS:
+            sample['%s_ms' % part] = _milliseconds(timings.durations[part])
+        sample['total_ms'] = _milliseconds(time.perf_counter() - start)
+
+        match = request.resolver_match
+        url_name = match.url_name if match is not None else None
+        response['Server-Timing'] = _server_timing(sample)
+        logger.info(
+            'url_name=%s status=%d queries=%d sql_ms=%s serializer_ms=%s '
+            'template_ms=%s total_ms=%s',
+            url_name, response.status_code, sample['queries'],
+            sample['sql_ms'], sample['serializer_ms'],
+            sample['template_ms'], sample['total_ms'],
+            extra=dict(sample, url_name=url_name)
+        )
+        if url_name is not None:
+            endpoint_samples.add(url_name, sample)
+
+        return response
@@ -35,6 +35,10 @@ urlpatterns = [
          views.like_dislike_post,
          name='rest-likedislike'
          ),
+    path('rest/likedislike/bulk/',
+         views.like_dislike_bulk,
+         name='rest-likedislike-bulk'
+         ),
 
     path(
         'rest/validate_username/',
@@ -43,12 +47,32 @@ urlpatterns = [
     ),
 
     path('rest/user_view/<int:pk>/', views.user_view, name='user-view'),
+    path(
+        'rest/users/<int:pk>/threads/',
+        views.user_threads,
+        name='rest-user-threads'
+    ),
+    path(
+        'rest/users/<int:pk>/responses/',
+        views.user_responses,
+        name='rest-user-responses'
+    ),
     path(
         'rest/forum_latest/',
         views.forum_latest_thread,
         name='rest-latest-thread'
     ),
 
+    path('rest/stats/', views.site_statistics, name='rest-stats'),
+    path('rest/search/', views.search_posts, name='rest-search'),
+    path('rest/batch/', views.batch_requests, name='rest-batch'),
+    path(
+        'rest/export/<str:scope>/<int:pk>/',
+        views.export_posts,
+        name='rest-export'
+    ),
+    path('rest/timings/', views.timing_stats, name='rest-timings'),
+
     path(
         'rest/forum_threads/<int:pk>/',
         views.forum_threads,
@@ -68,6 +92,11 @@ urlpatterns = [
     ),
 
     path('rest/logout/', views.logout, name='rest-logout'),
+    path(
+        'rest/auth_cache_stats/',
+        views.auth_cache_stats,
+        name='rest-auth-cache-stats'
+    ),
     path(
         'rest/get_user_id/<str:username>',
         views.get_user_id,
@@ -1,47 +1,89 @@
 import datetime
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.models import User
 from django.core.paginator import Paginator
-from django.db import IntegrityError
-from django.db.models import Max
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.http import HttpResponseRedirect, \
-    HttpResponseForbidden, HttpResponse, JsonResponse
-from django.shortcuts import render, redirect
+    HttpResponseForbidden, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from rest_framework import viewsets, permissions, mixins, generics, parsers, \
     renderers
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.serializers import AuthTokenSerializer
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
+from forumapp.authentication import get_forum_user, resolve_forum_user, \
+    token_cache
+from forumapp.conditional import conditional_on, thread_version, \
+    forum_version
+from forumapp.responsecache import cached_for_anonymous, all_content, \
+    bump_generations
 from forumapp.forms import ThreadCreateModelForm, ThreadResponseModelForm, \
     ThreadResponseDeleteForm, ThreadDeleteForm, BanUserForm, \
     PinThreadForm, StylizedUserCreationForm
+from forumapp import batch, export, search, timing
+from forumapp.activity import record_reply
+from forumapp.pagination import ThreadCursorPagination, \
+    ResponseCursorPagination, KeysetPagination, \
+    UserActivityCursorPagination, encode_cursor, decode_cursor
 from forumapp.permissions import IsNotBanned, IsOwnerOrReadOnly, CanPinThreads, \
-    CanBanUsers
+    CanBanUsers, is_banned, forget_ban
 from forumapp.serializers import ThreadSerializer, \
-    ForumUserSerializer, ThreadResponseSerializer, LikeDislikeSerializer, \
+    ForumUserSerializer, ThreadResponseSerializer, \
     ForumSerializer, ForumSectionSerializer, ThreadResponseUpdateSerializer, \
-    ThreadUpdateSerializer
-from .models import Thread, ForumSection, ThreadResponse, Forum, LikeDislike, \
-    ForumUser
+    ThreadUpdateSerializer, wants_id_lists, requested_fields, \
+    only_model_fields
+from forumapp.votes import attach_user_votes, user_votes, buffer_vote, \
+    toggle_vote, vote_buffer
+from .models import Thread, ForumSection, ThreadResponse, Forum, \
+    ForumUser, ForumSummary, SiteStatistics, ContentVersion
 
 
 class ForumViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Forum.objects.all()
     serializer_class = ForumSerializer
 
+    @method_decorator(cached_for_anonymous(all_content))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @method_decorator(cached_for_anonymous(forum_version))
+    @method_decorator(conditional_on(forum_version))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = Forum.objects.with_counts()
+        if wants_id_lists(self.request):
+            queryset = queryset.prefetch_related('thread_set')
+
+        return queryset
+
 
 class ForumSectionViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ForumSection.objects.all()
     serializer_class = ForumSectionSerializer
 
+    @method_decorator(cached_for_anonymous(all_content))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @method_decorator(cached_for_anonymous(all_content))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class ThreadViewSet(viewsets.ModelViewSet):
     queryset = Thread.objects.all()
@@ -53,6 +95,22 @@ class ThreadViewSet(viewsets.ModelViewSet):
         IsOwnerOrReadOnly
     )
 
+    @method_decorator(cached_for_anonymous(all_content))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @method_decorator(cached_for_anonymous(thread_version))
+    @method_decorator(conditional_on(thread_version))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = Thread.objects.with_counts()
+        if wants_id_lists(self.request):
+            queryset = queryset.prefetch_related('threadresponse_set')
+
+        return queryset
+
     def get_serializer_class(self):
         serializer_class = ThreadSerializer
 
@@ -85,7 +143,7 @@ class ThreadViewSet(viewsets.ModelViewSet):
         if errors:
             return JsonResponse(errors, status=400)
 
-        forum_user = ForumUser.objects.get(user=request.user)
+        forum_user = get_forum_user(request)
 
         thread = Thread.objects.create(
             forum=forum,
@@ -103,41 +161,19 @@ class ForumUserViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ForumUserSerializer
 
     def retrieve(self, request, *args, **kwargs):
-        pk = kwargs['pk']
         try:
-            forum_user = ForumUser.objects.get(id=pk)
+            forum_user = ForumUser.objects.select_related('user').get(
+                id=kwargs['pk']
+            )
         except ForumUser.DoesNotExist:
             return JsonResponse({'user': 'User does not exist.'}, status=404)
 
-        user_responses = ThreadResponse.objects.filter(
-            creator=pk
-        ).exclude(thread__isnull=True)
-
-        user_threads = Thread.objects.filter(
-            creator=pk
-        )
-
-        banned_until = None
-        if forum_user.banned_until.replace(
-                tzinfo=None
-        ) > datetime.datetime.now():
-            banned_until = forum_user.banned_until
-
-        can_ban = False
-        if request.user.has_perm('forumapp.can_ban_users'):
-            can_ban = True
-
-        user_responses = [resp.id for resp in user_responses]
-        user_threads = [thread.id for thread in user_threads]
-
-        return JsonResponse({
+        profile = _user_profile(request, forum_user)
+        profile.update({
             'username': forum_user.user.username,
-            'user_responses': user_responses,
-            'user_threads': user_threads,
-            'banned_until': banned_until,
-            'can_ban': can_ban,
             'id': forum_user.id
         })
+        return JsonResponse(profile)
         # return super().retrieve(request, *args, **kwargs)
 
 
@@ -159,12 +195,18 @@ class CustomObtainToken(APIView):
         )
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
+        forum_user = resolve_forum_user(user)
+        if forum_user is None:
+            return Response(
+                {'user': ['Only forum users can obtain a token.']},
+                status=403
+            )
+
         token, created = Token.objects.get_or_create(user=user)
-        forum_user = ForumUser.objects.get(user=user)
         return Response({
             'token': token.key,
             'user_id': forum_user.id,
-            'username': forum_user.user.username
+            'username': user.username
         })
 
 
@@ -205,16 +247,18 @@ class ThreadResponseViewSet(viewsets.ModelViewSet):
                 'thread': ['Specified thread does not exist.']
             }, status=404)
 
-        forum_user = ForumUser.objects.get(user=request.user)
+        forum_user = get_forum_user(request)
 
-        response = ThreadResponse.objects.create(
-            thread=thread,
-            creator=forum_user,
-            message=request.data['message'],
-        )
+        # the cached versions bumped by the insert's signals are bumped
+        # again on commit, after the activity has moved too
+        with transaction.atomic():
+            response = ThreadResponse.objects.create(
+                thread=thread,
+                creator=forum_user,
+                message=request.data['message'],
+            )
+            record_reply(thread)
 
-        thread.last_activity = datetime.datetime.now()
-        thread.save()
         serializer = ThreadResponseSerializer(response)
         return JsonResponse(serializer.data, status=201)
 
@@ -238,6 +282,10 @@ class BanUser(
             )
         return self.update(request, *args, **kwargs)
 
+    def perform_update(self, serializer):
+        forum_user = serializer.save()
+        forget_ban(forum_user.user_id)
+
 
 class PinThread(
     mixins.RetrieveModelMixin,
@@ -259,15 +307,26 @@ class PinThread(
 
 
 @api_view(['GET'])
+@cached_for_anonymous(forum_version)
+@conditional_on(forum_version)
 def forum_threads(request, pk):
     try:
         Forum.objects.get(id=pk)
     except Forum.DoesNotExist:
         return JsonResponse({'pk': 'Forum does not exist.'}, status=404)
 
-    threads = Thread.objects.filter(forum=pk)
-    serializer = ThreadSerializer(threads, many=True)
-    return JsonResponse(serializer.data, safe=False)
+    threads = Thread.objects.filter(forum=pk).with_counts()
+    if wants_id_lists(request):
+        threads = threads.prefetch_related('threadresponse_set')
+
+    paginator = ThreadCursorPagination()
+    page = paginator.paginate_queryset(threads, request)
+    serializer = ThreadSerializer(
+        page,
+        many=True,
+        context={'request': request}
+    )
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(["GET"])
@@ -287,41 +346,188 @@ def get_user_id(request, username):
 
 @api_view(['GET'])
 def forum_latest_thread(request):
-    # latest = Thread.objects.filter(
-    #     forum=OuterRef('pk')
-    # ).order_by(
-    #     '-last_activity'
-    # )
-    # result = Forum.objects.annotate(
-    #     latest=Subquery(latest.values('last_activity')[:1]),
-    #     latest_thread_id=Subquery(latest.values('pk')[:1])
-    # )
-
-    raw_query = """
-    SELECT "forumapp_thread"."forum_id",
-           "forumapp_thread"."id",
-           "forumapp_thread"."name",
-           MAX("forumapp_thread"."last_activity") AS "latest"
-    FROM "forumapp_thread"
-    GROUP BY "forumapp_thread"."forum_id"
-    ORDER BY "forumapp_thread"."forum_id" DESC
-    """
-
-    from django.db import connection
-    cursor = connection.cursor()
-    cursor.execute(raw_query)
-    result = cursor.fetchall()
+    summaries = ForumSummary.objects.filter(
+        latest_thread__isnull=False
+    ).order_by(
+        '-forum'
+    ).values_list('forum', 'latest_thread', 'latest_thread__name')
 
     latest_threads_by_forum = [{
-        'name': val[2],
-        'id': val[1],
-        'forum': val[0]
-    } for val in result]
+        'name': name,
+        'id': thread_id,
+        'forum': forum_id
+    } for forum_id, thread_id, name in summaries]
 
     return JsonResponse(latest_threads_by_forum, safe=False)
 
 
 @api_view(['GET'])
+def site_statistics(request):
+    statistics = SiteStatistics.get()
+    return JsonResponse({
+        'users': statistics.users,
+        'threads': statistics.threads,
+        'responses': statistics.responses
+    })
+
+
+def _user_threads(pk):
+    return Thread.objects.filter(creator=pk).values(
+        'id', 'name', 'forum', 'created_datetime'
+    )
+
+
+def _user_responses(pk):
+    return ThreadResponse.objects.filter(creator=pk).values(
+        'id', 'thread', 'position', 'created_datetime',
+        forum=F('thread__forum')
+    )
+
+
+def _user_profile(request, forum_user):
+    """
+    Counts and the first page of recent threads and responses of a user;
+    the other pages come from rest-user-threads and rest-user-responses.
+    """
+    banned_until = None
+    if forum_user.banned_until.replace(
+            tzinfo=None
+    ) > datetime.datetime.now():
+        banned_until = forum_user.banned_until
+
+    profile = {
+        'banned_until': banned_until,
+        'can_ban': request.user.has_perm('forumapp.can_ban_users'),
+        'thread_count': Thread.objects.filter(creator=forum_user).count(),
+        'response_count': ThreadResponse.objects.filter(
+            creator=forum_user
+        ).count(),
+    }
+    for name, queryset, url_name in (
+            ('recent_threads', _user_threads, 'rest-user-threads'),
+            ('recent_responses', _user_responses, 'rest-user-responses'),
+    ):
+        paginator = UserActivityCursorPagination()
+        page = paginator.first_page(
+            queryset(forum_user.pk),
+            request,
+            request.build_absolute_uri(
+                reverse(url_name, kwargs={'pk': forum_user.pk})
+            )
+        )
+        profile[name] = paginator.get_paginated_data(page)
+
+    return profile
+
+
+@api_view(['GET'])
+def user_threads(request, pk):
+    paginator = UserActivityCursorPagination()
+    page = paginator.paginate_queryset(_user_threads(pk), request)
+    return paginator.get_paginated_response(page)
+
+
+@api_view(['GET'])
+def user_responses(request, pk):
+    paginator = UserActivityCursorPagination()
+    page = paginator.paginate_queryset(_user_responses(pk), request)
+    return paginator.get_paginated_response(page)
+
+
+@api_view(['GET'])
+def search_posts(request):
+    if not search.search_available():
+        return JsonResponse(
+            {'q': ['Search is not available.']},
+            status=501
+        )
+
+    expression = search.match_expression(request.query_params.get('q', ''))
+    if expression is None:
+        return JsonResponse({'q': ['Provide a search query.']}, status=400)
+
+    try:
+        forum_ids = list(map(int, request.query_params.getlist('forum')))
+    except ValueError:
+        return JsonResponse({'forum': ['Forum ids must be integers.']},
+                            status=400)
+
+    after = None
+    if request.query_params.get('cursor'):
+        try:
+            rank, rowid = decode_cursor(request.query_params['cursor'])
+            after = float(rank), int(rowid)
+        except (TypeError, ValueError):
+            raise NotFound(KeysetPagination.invalid_cursor_message)
+
+    page_size = KeysetPagination().get_page_size(request)
+    results = search.search(expression, forum_ids, after, page_size + 1)
+
+    next_link = None
+    if len(results) > page_size:
+        results = results[:page_size]
+        next_link = replace_query_param(
+            request.build_absolute_uri(),
+            'cursor',
+            encode_cursor([results[-1]['rank'], results[-1]['rowid']])
+        )
+
+    for result in results:
+        del result['rowid']
+
+    return Response({'next': next_link, 'results': results})
+
+
+@api_view(['POST'])
+def batch_requests(request):
+    """
+    Runs several GET requests against the api in one round trip.
+    :param requests list of {"path": ...}, "method" may only be GET
+    :return list of {"path", "status", "body"} in the order of requests
+    """
+    parts = request.data.get('requests') \
+        if isinstance(request.data, dict) else None
+    if not isinstance(parts, list) or not parts:
+        return JsonResponse(
+            {'requests': ['Provide a list of requests.']},
+            status=400
+        )
+
+    if len(parts) > settings.FORUMAPP_BATCH_MAX_REQUESTS:
+        return JsonResponse(
+            {'requests': ['At most %d requests can be batched.'
+                          % settings.FORUMAPP_BATCH_MAX_REQUESTS]},
+            status=400
+        )
+
+    matches = []
+    for part in parts:
+        if not isinstance(part, dict) \
+                or not isinstance(part.get('path'), str) \
+                or part.get('method', 'GET').upper() != 'GET':
+            return JsonResponse(
+                {'requests': ['Each request needs a path; only GET '
+                              'requests can be batched.']},
+                status=400
+            )
+
+        try:
+            match = batch.resolve_api_path(
+                part['path'],
+                excluded=('rest-batch', 'rest-export')
+            )
+        except batch.BatchError as error:
+            return JsonResponse({'requests': [str(error)]}, status=400)
+        matches.append((match, part['path']))
+
+    return Response([
+        batch.run(request, match, path) for match, path in matches
+    ])
+
+
+@api_view(['GET'])
+@cached_for_anonymous(thread_version)
+@conditional_on(thread_version)
 def thread_responses(request, pk):
     try:
         Thread.objects.get(id=pk)
@@ -329,38 +535,81 @@ def thread_responses(request, pk):
         return JsonResponse({'pk': 'Thread does not exist.'}, status=404)
 
     responses = ThreadResponse.objects.filter(thread=pk)
-    serializer = ThreadResponseSerializer(responses, many=True)
-    return JsonResponse(serializer.data, safe=False)
+    paginator = ResponseCursorPagination()
+    page = paginator.paginate_queryset(responses, request)
+    serializer = ThreadResponseSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
-@api_view(["GET"])
-def threads_bulk(request):
-    if 'threads[]' not in request.query_params:
+def _bulk_fetch(request, name, queryset, serializer_class):
+    """
+    Serializes the objects whose ids are given in `name[]`, in the order
+    the ids were requested.
+    :return {"results": [...], "missing": [ids that do not exist]}
+    """
+    if name + '[]' not in request.query_params:
         return JsonResponse(
-            {'threads': ['Provide a list of threads']},
+            {name: ['Provide a list of %s.' % name]},
             status=400
         )
 
-    ids = request.query_params.getlist('threads[]')
-    ids = list(map(int, ids))
-    threads = Thread.objects.filter(id__in=ids)
-    threads_serialized = ThreadSerializer(threads, many=True)
-    return Response(threads_serialized.data)
-
+    try:
+        ids = list(map(int, request.query_params.getlist(name + '[]')))
+    except ValueError:
+        return JsonResponse(
+            {name: ['Ids must be integers.']},
+            status=400
+        )
 
-@api_view(["GET"])
-def responses_bulk(request):
-    if 'responses[]' not in request.query_params:
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.FORUMAPP_BULK_MAX_IDS:
         return JsonResponse(
-            {'responses': ['Provide a list of responses.']},
+            {name: ['At most %d ids can be requested.'
+                    % settings.FORUMAPP_BULK_MAX_IDS]},
             status=400
         )
 
-    ids = request.query_params.getlist('responses[]')
-    ids = list(map(int, ids))
-    responses = ThreadResponse.objects.filter(id__in=ids)
-    responses_serialized = ThreadResponseSerializer(responses, many=True)
-    return Response(responses_serialized.data)
+    fields = requested_fields(request)
+    if fields is not None:
+        queryset = queryset.only(*only_model_fields(serializer_class, fields))
+
+    # keeps every IN list below the SQLite bound variable limit
+    chunk_size = settings.FORUMAPP_BULK_CHUNK_SIZE
+    found = {}
+    for start in range(0, len(ids), chunk_size):
+        found.update(
+            (obj.pk, obj) for obj in
+            queryset.filter(id__in=ids[start:start + chunk_size])
+        )
+
+    serializer = serializer_class(
+        [found[pk] for pk in ids if pk in found],
+        many=True,
+        context={'request': request}
+    )
+    return Response({
+        'results': serializer.data,
+        'missing': [pk for pk in ids if pk not in found]
+    })
+
+
+@api_view(["GET"])
+def threads_bulk(request):
+    threads = Thread.objects.with_counts()
+    if wants_id_lists(request):
+        threads = threads.prefetch_related('threadresponse_set')
+
+    return _bulk_fetch(request, 'threads', threads, ThreadSerializer)
+
+
+@api_view(["GET"])
+def responses_bulk(request):
+    return _bulk_fetch(
+        request,
+        'responses',
+        ThreadResponse.objects.all(),
+        ThreadResponseSerializer
+    )
 
 
 @api_view(["POST"])
@@ -429,14 +678,10 @@ def signup(request):
 
 
 def index(request):
-    users_count = User.objects.count()
-    threads_count = Thread.objects.count()
-
-    responses_count = ThreadResponse.objects.exclude(
-        thread__isnull=True
-    ).count()
-
-    responses_count -= threads_count
+    statistics = SiteStatistics.get()
+    users_count = statistics.users
+    threads_count = statistics.threads
+    responses_count = statistics.responses - threads_count
 
     return render(
         request,
@@ -450,7 +695,14 @@ def index(request):
 
 
 def forums(request):
-    sections = ForumSection.objects.all()
+    sections = list(ForumSection.objects.order_by('id'))
+    forums_by_section = {section.id: [] for section in sections}
+    for forum_overview in Forum.objects.overview().order_by('id'):
+        forums_by_section[forum_overview.section_id].append(forum_overview)
+
+    for section in sections:
+        section.forums = forums_by_section[section.id]
+
     return render(
         request,
         'forumapp/forums.html',
@@ -461,13 +713,13 @@ def forums(request):
 
 
 def forum(request, pk):
+    forum = get_object_or_404(Forum.objects.select_related('section'), id=pk)
     thread_list = Thread.objects.filter(
         forum=pk
-    ).annotate(
-        last_response=Max('threadresponse__created_datetime')
-    ).order_by(
+    ).listing().order_by(
         '-pinned',
-        '-last_response'
+        '-last_activity',
+        '-id'
     )
 
     thread_paginator = Paginator(thread_list, 10)
@@ -479,7 +731,11 @@ def forum(request, pk):
         'forumapp/thread_list.html',
         context={
             'thread_list': thread_list,
-            'forum': Forum.objects.get(id=pk)
+            'forum': forum,
+            'version': ContentVersion.lookup(
+                ContentVersion.forum_key(pk)
+            )[0],
+            'fragment_ttl': settings.FORUMAPP_FRAGMENT_CACHE_TTL,
         }
     )
 
@@ -508,16 +764,25 @@ def pin_thread(request, fpk, tpk):
 
 
 def thread_view(request, fpk, tpk):
-    thread = Thread.objects.get(id=tpk)
-    parent_forum = Forum.objects.get(id=fpk)
+    thread = get_object_or_404(
+        Thread.objects.select_related('forum', 'creator'),
+        id=tpk,
+        forum=fpk
+    )
     response_list = ThreadResponse.objects.filter(
         thread=tpk,
         thread__forum=fpk
+    ).select_related(
+        'creator__user'
     ).order_by(
-        'created_datetime'
+        'created_datetime',
+        'id'
     )
-    can_delete_thread = response_list[0].responder == request.user or \
-                        request.user.has_perm("forumapp.can_remove_any_thread")
+
+    user = request.user
+    can_remove_any = user.has_perm('forumapp.can_remove_any_response')
+    can_delete_thread = thread.creator.user_id == user.id or \
+        user.has_perm('forumapp.can_remove_any_thread')
 
     response_paginator = Paginator(
         response_list,
@@ -526,6 +791,16 @@ def thread_view(request, fpk, tpk):
 
     page = request.GET.get('page')
     response_list = response_paginator.get_page(page)
+    response_list.object_list = attach_user_votes(
+        response_list.object_list,
+        user
+    )
+    for response in response_list.object_list:
+        response.can_edit = response.creator.user_id == user.id
+        # the first response of a thread cannot be deleted
+        response.can_remove = response.position > 1 and (
+            response.can_edit or can_remove_any
+        )
 
     return render(
         request,
@@ -533,9 +808,14 @@ def thread_view(request, fpk, tpk):
         context={
             'thread': thread,
             'response_list': response_list,
-            'forum': parent_forum,
+            'forum': thread.forum,
+            'forum_id': fpk,
+            'thread_id': tpk,
             'can_delete_thread': can_delete_thread,
-            # 'like_dislike_forms': like_dislike_forms
+            'version': ContentVersion.lookup(
+                ContentVersion.thread_key(tpk)
+            )[0],
+            'fragment_ttl': settings.FORUMAPP_FRAGMENT_CACHE_TTL,
         }
     )
 
@@ -554,6 +834,7 @@ def ban_user(request, pk):
             forum_user = ForumUser.objects.get(user=pk)
             forum_user.banned_until = ban_user_form.cleaned_data['banned_until']
             forum_user.save()
+            forget_ban(forum_user.user_id)
             return HttpResponse("Ban date changed successfully!")
 
     return render(
@@ -572,6 +853,48 @@ def logout(request):
     return JsonResponse({'msg': "Logged out"}, status=200)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser, ])
+def auth_cache_stats(request):
+    """
+    Hit ratio of the token authentication cache, for monitoring.
+    """
+    return JsonResponse(token_cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser, ])
+def export_posts(request, scope, pk):
+    """
+    Streams every post of a thread, forum or forum user.
+    :param output ndjson (default) or json for a single array
+    """
+    if scope not in export.SCOPES:
+        return JsonResponse(
+            {'scope': ['Choose one of: %s.' % ', '.join(export.SCOPES)]},
+            status=404
+        )
+
+    output = request.query_params.get('output', export.NDJSON)
+    if output not in export.OUTPUTS:
+        return JsonResponse(
+            {'output': ['Choose one of: %s.' % ', '.join(export.OUTPUTS)]},
+            status=400
+        )
+
+    if not export.exists(scope, pk):
+        return JsonResponse({'pk': '%s does not exist.' % scope.title()},
+                            status=404)
+
+    response = StreamingHttpResponse(
+        export.encode(export.posts(scope, pk), output),
+        content_type=export.CONTENT_TYPES[output]
+    )
+    response['Content-Disposition'] = \
+        'attachment; filename="%s-%d.%s"' % (scope, pk, output)
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, ])
 def like_dislike_post(request, pk):
@@ -579,6 +902,7 @@ def like_dislike_post(request, pk):
     This function is used to like or dislike a post.
     :param pk id of the response
     :param like whether a like has been sent; dislike otherwise
+    :return the vote and the score of the response after the toggle
     """
 
     if 'like' not in request.data:
@@ -589,39 +913,78 @@ def like_dislike_post(request, pk):
 
     like = True if request.data['like'].lower() == 'true' else False
 
-    try:
-        like_dislike_obj = LikeDislike.objects.get(
-            response=ThreadResponse.objects.get(id=pk),
-            user=request.user
+    forum_user = get_forum_user(request)
+    if forum_user is None:
+        return JsonResponse(
+            {'user': ['Only forum users can vote.']},
+            status=403
         )
 
-        if like_dislike_obj.like == like:
-            like_dislike_obj.delete()
-            return JsonResponse({'id': pk}, status=204)
-        else:
-            print("Like", like)
-            print("obj", like_dislike_obj.like)
-            like_dislike_obj.like = like
-            like_obj = like_dislike_obj.save()
-            like_serializer = LikeDislikeSerializer(like_obj)
-            return JsonResponse(like_serializer.data, status=200)
-
-    except LikeDislike.DoesNotExist:
-        like_dislike_obj = LikeDislike.objects.create(
-            response=ThreadResponse.objects.get(id=pk),
-            user=request.user
+    if settings.FORUMAPP_VOTE_WRITE_BEHIND:
+        counts = ThreadResponse.objects.filter(id=pk).values_list(
+            'likes',
+            'dislikes',
+            'thread'
+        ).first()
+        if counts is None:
+            return JsonResponse(
+                {'pk': 'Response does not exist.'},
+                status=404
+            )
+
+        previous, latest = buffer_vote(request.user, pk, like)
+        likes, dislikes = vote_buffer.deltas().get(pk, (0, 0))
+        score = counts[0] + likes - counts[1] - dislikes
+        # buffered votes are overlaid on reads right away
+        bump_generations(ContentVersion.thread_key(counts[2]))
+    else:
+        toggled = toggle_vote(forum_user.pk, pk, like)
+        if toggled is None:
+            return JsonResponse(
+                {'pk': 'Response does not exist.'},
+                status=404
+            )
+        previous, latest, score, thread_id = toggled
+        # the vote triggers bump the thread's version but cannot reach the
+        # response cache
+        bump_generations(ContentVersion.thread_key(thread_id))
+
+    # a removed vote answers 200 with like null, 204 could not carry the
+    # score
+    return JsonResponse(
+        {'like': latest, 'response': pk, 'score': score},
+        status=201 if previous is None else 200
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, ])
+def like_dislike_bulk(request):
+    """
+    Returns the caller's vote on each of the given responses.
+    :param responses[] ids of the responses
+    :return mapping of response id to 1 (like), -1 (dislike) or 0
+    """
+    if 'responses[]' not in request.query_params:
+        return JsonResponse(
+            {'responses': ['Provide a list of responses.']},
+            status=400
+        )
+
+    try:
+        ids = list(map(int, request.query_params.getlist('responses[]')))
+    except ValueError:
+        return JsonResponse(
+            {'responses': ['Response ids must be integers.']},
+            status=400
         )
-        like_dislike_obj.like = like
-        like_dislike_obj.save()
-        like_serializer = LikeDislikeSerializer(like_dislike_obj)
 
-        return JsonResponse(like_serializer.data, status=201)
+    return JsonResponse(user_votes(request.user, ids))
 
 
 @login_required
 def respond(request, fpk, tpk):
-    forum_user = ForumUser.objects.get(user=request.user)
-    if forum_user.banned_until.replace(tzinfo=None) > datetime.datetime.now():
+    if is_banned(request.user):
         return HttpResponseForbidden("You are banned! "
                                      "Check your profile for details.")
 
@@ -635,8 +998,6 @@ def respond(request, fpk, tpk):
             obj_response.responder = request.user
             obj_response.created_datetime = datetime.datetime.now()
             obj_response.thread = Thread.objects.get(id=tpk)
-            obj_response.order_in_thread = \
-                obj_response.thread.threadresponse_set.count() + 1
 
             obj_response.save()
 
@@ -695,18 +1056,6 @@ def delete_thread(request, fpk, tpk):
         )
 
 
-def enumerate_posts(thread_pk):
-    responses = Thread.objects.get(
-        id=thread_pk
-    ).threadresponse_set.all().order_by(
-        'created_datetime'
-    )
-
-    for i, response in enumerate(responses):
-        response.order_in_thread = i + 1
-        response.save()
-
-
 @login_required
 def delete_post(request, fpk, tpk, ppk):
     """
@@ -736,8 +1085,6 @@ def delete_post(request, fpk, tpk, ppk):
                 return HttpResponseForbidden(
                     "You are not allowed to delete this post.")
 
-            enumerate_posts(tpk)
-
             return HttpResponseRedirect(
                 reverse(
                     'thread-view',
@@ -813,36 +1160,18 @@ def validate_username(request):
 @api_view(["GET"])
 def user_view(request, pk):
     try:
-        forum_user = ForumUser.objects.get(id=pk)
+        forum_user = ForumUser.objects.select_related('user').get(id=pk)
     except ForumUser.DoesNotExist:
         return JsonResponse({'user': 'User does not exist.'}, status=404)
-    user_responses = ThreadResponse.objects.filter(
-        responder=pk
-    ).exclude(thread__isnull=True)
-
-    banned_until = None
-    # forum_user = ForumUser.objects.get(user=viewed_user)
-    if forum_user.banned_until.replace(tzinfo=None) > datetime.datetime.now():
-        banned_until = forum_user.banned_until
-
-    can_ban = False
-    if request.user.has_perm('forumapp.can_ban_users'):
-        can_ban = True
 
-    user_responses = [resp.id for resp in user_responses]
-
-    return JsonResponse({
-        'viewed_user': forum_user.user.username,
-        'user_responses': user_responses,
-        'banned_until': banned_until,
-        'can_ban': can_ban
-    })
+    profile = _user_profile(request, forum_user)
+    profile['viewed_user'] = forum_user.user.username
+    return JsonResponse(profile)
 
 
 @login_required
 def new_thread(request, pk):
-    forum_user = ForumUser.objects.get(user=request.user)
-    if forum_user.banned_until.replace(tzinfo=None) > datetime.datetime.now():
+    if is_banned(request.user):
         return HttpResponseForbidden("You are banned! "
                                      "Check your profile for details.")
 
@@ -891,3 +1220,14 @@ def new_thread(request, pk):
                 'forum': pk
             }
         )
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def timing_stats(request):
+    """
+    Percentiles of the query count and of the SQL, serializer, template and
+    total time of the recent requests of every endpoint, as measured by
+    TimingMiddleware in this process. Times are in milliseconds.
+    """
+    return JsonResponse(timing.endpoint_samples.summary())
@@ -0,0 +1,362 @@
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from forumapp.models import ContentVersion, ForumUser, LikeDislike, \
+    ThreadResponse
+from forumapp.responsecache import bump_generations
+from forumapp.writebehind import WriteBehindBuffer
+
+# (user, response) pairs per statement, two bound variables each
+VOTE_CHUNK_SIZE = 400
+
+# created by migration 0009
+VOTE_TRIGGERS = (
+    'forumapp_likedislike_insert',
+    'forumapp_likedislike_delete',
+    'forumapp_likedislike_update',
+)
+
+# RETURNING does not see the changes made by the counter triggers, so the
+# score is the one from before the statement
+_SCORE_SQL = (
+    '(SELECT likes - dislikes FROM forumapp_threadresponse WHERE id = %s)'
+)
+
+_THREAD_SQL = (
+    '(SELECT thread_id FROM forumapp_threadresponse WHERE id = %s)'
+)
+
+DELETE_VOTE_SQL = (
+    'DELETE FROM forumapp_likedislike '
+    'WHERE user_id = %s AND response_id = %s '
+    'RETURNING "like", ' + _SCORE_SQL + ', ' + _THREAD_SQL
+)
+
+UPSERT_VOTE_SQL = (
+    'INSERT INTO forumapp_likedislike (user_id, response_id, "like") '
+    'SELECT %s, id, %s FROM forumapp_threadresponse WHERE id = %s '
+    'ON CONFLICT (user_id, response_id) '
+    'DO UPDATE SET "like" = excluded."like" '
+    'RETURNING ' + _SCORE_SQL + ', ' + _THREAD_SQL
+)
+
+
+def atomic_votes(connection):
+    """
+    Whether votes are written with DELETE/UPSERT ... RETURNING and counted
+    by the triggers of migration 0009. That needs SQLite 3.35 or later and
+    the triggers to be there: migrate skips them on older SQLite, and
+    remaking the table drops them. The answer is cached per connection.
+    Otherwise votes take the ORM path, which recounts the response itself.
+    """
+    if connection.vendor != 'sqlite' or \
+            connection.Database.sqlite_version_info < (3, 35, 0):
+        return False
+
+    connection.ensure_connection()
+    cached = getattr(connection, '_forumapp_vote_triggers', None)
+    if cached is None or cached[0] is not connection.connection:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+                'AND name IN (%s, %s, %s)',
+                VOTE_TRIGGERS
+            )
+            found = cursor.fetchone()[0] == len(VOTE_TRIGGERS)
+        cached = (connection.connection, found)
+        connection._forumapp_vote_triggers = cached
+
+    return cached[1]
+
+
+def _vote_count(like):
+    votes = LikeDislike.objects.filter(
+        response=OuterRef('pk'),
+        like=like
+    ).order_by().values('response').annotate(
+        count=Count('pk')
+    ).values('count')
+
+    return Coalesce(Subquery(votes, output_field=IntegerField()), 0)
+
+
+def recount_votes(responses=None):
+    """
+    Recomputes the denormalized like/dislike counters from LikeDislike rows.
+    :param responses queryset of responses to fix; all responses otherwise
+    :return number of updated responses
+    """
+    if responses is None:
+        responses = ThreadResponse.objects.all()
+
+    return responses.update(
+        likes=_vote_count(True),
+        dislikes=_vote_count(False)
+    )
+
+
+def user_votes(user, response_ids):
+    """
+    Fetches the votes of a user on the given responses in one query.
+    :param user auth user whose votes are looked up
+    :return dict mapping response id to 1 (like), -1 (dislike) or 0
+    """
+    votes = dict.fromkeys(response_ids, 0)
+    if not user.is_authenticated or not votes:
+        return votes
+
+    for response_id, like in LikeDislike.objects.filter(
+            user__user=user,
+            response__in=votes.keys()
+    ).values_list('response', 'like'):
+        votes[response_id] = 1 if like else -1
+
+    if len(vote_buffer):
+        for response_id in votes:
+            buffered = vote_buffer.get((user.pk, response_id))
+            if buffered is not None:
+                votes[response_id] = _vote_value(buffered[1])
+
+    return votes
+
+
+def attach_user_votes(responses, user):
+    """
+    Sets `user_vote` on every response of a page using a single query.
+    """
+    responses = overlay_buffered_votes(responses)
+    votes = user_votes(user, [response.id for response in responses])
+    for response in responses:
+        response.user_vote = votes[response.id]
+
+    return responses
+
+
+def toggle_vote(forum_user_id, response_id, like):
+    """
+    Likes or dislikes a response in at most two statements: voting the
+    same way twice removes the vote. The vote counters and the thread's
+    content version are maintained by triggers on LikeDislike. Databases
+    without them fall back to `_toggle_vote_orm`.
+
+    :return tuple (previous vote, latest vote, score, thread id) or None
+        if the response does not exist; votes are True, False or None
+    """
+    if not atomic_votes(connection):
+        return _toggle_vote_orm(forum_user_id, response_id, like)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # the write lock is held from here on, so nobody can vote between
+        # the two statements
+        cursor.execute(DELETE_VOTE_SQL, [forum_user_id, response_id,
+                                         response_id, response_id])
+        row = cursor.fetchone()
+        previous = None if row is None else bool(row[0])
+        if previous == like:
+            return previous, None, row[1] - _vote_value(like), row[2]
+
+        cursor.execute(UPSERT_VOTE_SQL, [forum_user_id, like, response_id,
+                                         response_id, response_id])
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        return previous, like, row[0] + _vote_value(like), row[1]
+
+
+def _toggle_vote_orm(forum_user_id, response_id, like):
+    """
+    toggle_vote for databases without RETURNING or the counter triggers.
+    Voters on a response are serialized by locking its row, and the
+    counters are recounted from the votes rather than adjusted.
+    """
+    responses = ThreadResponse.objects.filter(pk=response_id)
+    with transaction.atomic():
+        thread_id = responses.select_for_update().values_list(
+            'thread',
+            flat=True
+        ).first()
+        if thread_id is None:
+            return None
+
+        votes = LikeDislike.objects.filter(
+            user=forum_user_id,
+            response=response_id
+        )
+        previous = votes.values_list('like', flat=True).first()
+        latest = None if previous == like else like
+        if latest is None:
+            votes.delete()
+        elif previous is None:
+            LikeDislike.objects.create(
+                user_id=forum_user_id,
+                response_id=response_id,
+                like=latest
+            )
+        else:
+            votes.update(like=latest)
+
+        recount_votes(responses)
+        ContentVersion.bump(ContentVersion.thread_key(thread_id))
+        score = responses.values_list(
+            F('likes') - F('dislikes'),
+            flat=True
+        ).get()
+
+    return previous, latest, score, thread_id
+
+
+def _vote_value(like):
+    return 0 if like is None else 1 if like else -1
+
+
+def _vote_counts(like):
+    """
+    :return tuple (likes, dislikes) a vote contributes to its response
+    """
+    return int(like is True), int(like is False)
+
+
+class VoteBuffer(WriteBehindBuffer):
+    """
+    Pending votes, (auth user id, response id) -> (stored, latest) where
+    `stored` is the vote in the database when the pair was first buffered
+    and `latest` the one to write; True is a like, False a dislike and
+    None no vote.
+    """
+
+    def merge(self, old, new):
+        return old[0], new[1]
+
+    def toggle(self, key, like, load_stored):
+        """
+        Toggles the vote under `key` in one step under the buffer lock, so
+        that concurrent toggles of the same pair apply one after the other.
+
+        :param load_stored callable returning the vote in the database;
+            only called when nothing is buffered for `key`
+        :return tuple (previous, latest) votes: True, False or None
+        """
+        with self._lock:
+            buffered = self._pending.get(key)
+            if buffered is None and key in self._in_flight:
+                # relative to the vote being written, see WriteBehindBuffer
+                written = self._in_flight[key][1]
+                buffered = (written, written)
+            elif buffered is None:
+                stored = load_stored()
+                buffered = (stored, stored)
+
+            latest = None if buffered[1] == like else like
+            self._pending[key] = (buffered[0], latest)
+            self._start()
+
+        return buffered[1], latest
+
+    def deltas(self):
+        """
+        :return dict response id -> (likes, dislikes) not yet counted
+        """
+        deltas = {}
+        for (_, response_id), (stored, latest) in self.pending().items():
+            likes, dislikes = deltas.get(response_id, (0, 0))
+            old, new = _vote_counts(stored), _vote_counts(latest)
+            deltas[response_id] = (
+                likes + new[0] - old[0],
+                dislikes + new[1] - old[1]
+            )
+
+        return deltas
+
+    def write(self, entries):
+        forum_users = dict(ForumUser.objects.filter(
+            user__in={user_id for user_id, _ in entries}
+        ).values_list('user', 'id'))
+        responses = dict(ThreadResponse.objects.filter(
+            pk__in={response_id for _, response_id in entries}
+        ).values_list('pk', 'thread'))
+        # votes of users without a ForumUser or on responses deleted since
+        # could never be written
+        keys = [
+            (user_id, response_id) for user_id, response_id in entries
+            if user_id in forum_users and response_id in responses
+        ]
+        votes = [
+            LikeDislike(
+                user_id=forum_users[user_id],
+                response_id=response_id,
+                like=entries[user_id, response_id][1]
+            ) for user_id, response_id in keys
+            if entries[user_id, response_id][1] is not None
+        ]
+        thread_keys = {
+            ContentVersion.thread_key(responses[response_id])
+            for _, response_id in keys
+        }
+
+        with transaction.atomic():
+            # replacing every touched pair upserts and deletes in bulk;
+            # the LikeDislike triggers keep the counters in step, other
+            # databases recount the touched responses below
+            for start in range(0, len(keys), VOTE_CHUNK_SIZE):
+                LikeDislike.objects.filter(reduce(or_, (
+                    Q(user=forum_users[user_id], response=response_id)
+                    for user_id, response_id
+                    in keys[start:start + VOTE_CHUNK_SIZE]
+                ))).delete()
+            LikeDislike.objects.bulk_create(votes)
+
+            if not atomic_votes(connection):
+                recount_votes(ThreadResponse.objects.filter(
+                    pk__in={response_id for _, response_id in keys}
+                ))
+                ContentVersion.bump(*thread_keys)
+                return
+
+        if thread_keys:
+            # the triggers bumped the versions, the response cache is left;
+            # other processes cached these threads without the overlay
+            bump_generations(*thread_keys)
+
+
+vote_buffer = VoteBuffer(interval=settings.FORUMAPP_VOTE_FLUSH_MS / 1000)
+
+
+def overlay_buffered_votes(responses):
+    """
+    Adds the votes still in the buffer to the like/dislike counters of
+    `responses`.
+    """
+    responses = list(responses)
+    if not len(vote_buffer):
+        return responses
+
+    deltas = vote_buffer.deltas()
+    for response in responses:
+        likes, dislikes = deltas.get(response.id, (0, 0))
+        response.likes += likes
+        response.dislikes += dislikes
+
+    return responses
+
+
+def buffer_vote(user, response_id, like):
+    """
+    Toggles the vote of `user` in the buffer: voting the same way twice
+    removes the vote.
+
+    :return tuple (previous, latest) votes: True, False or None
+    """
+
+    def load_stored():
+        return LikeDislike.objects.filter(
+            user__user=user,
+            response=response_id
+        ).values_list('like', flat=True).first()
+
+    return vote_buffer.toggle((user.pk, response_id), like, load_stored)
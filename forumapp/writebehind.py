@@ -0,0 +1,145 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer(object):
+    """
+    Coalesces writes in memory and applies them in batches.
+
+    Entries are keyed; a new value for a pending key is combined with the
+    old one by `merge`, so each key costs at most one write per flush.
+    With a positive `interval` a daemon thread flushes every `interval`
+    seconds once the first entry arrives. Whatever the interval, pending
+    entries are flushed when the interpreter exits. Anything still
+    buffered when the process dies is lost.
+
+    A flush moves the pending entries aside while it writes them, so
+    readers see them until they are in the database without waiting for
+    the write. An entry added for a key being written must be relative to
+    the written value: if the write fails, the two are merged back.
+
+    Subclasses implement `write`.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._pending = {}
+        # entries the running flush is writing
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        # held for a whole flush, so that flushes run one at a time
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._flushes_at_exit = False
+
+    def merge(self, old, new):
+        return new
+
+    def write(self, entries):
+        """
+        Applies a batch of entries to the database.
+
+        :param entries: dict of key -> merged value
+        """
+        raise NotImplementedError
+
+    def add(self, key, value):
+        with self._lock:
+            if key in self._pending:
+                value = self.merge(self._pending[key], value)
+            self._pending[key] = value
+            self._start()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._pending:
+                return self._in_flight.get(key, default)
+            if key not in self._in_flight:
+                return self._pending[key]
+            return self.merge(self._in_flight[key], self._pending[key])
+
+    def _merged(self, written, added):
+        entries = dict(written)
+        for key, value in added.items():
+            entries[key] = self.merge(entries[key], value) \
+                if key in entries else value
+        return entries
+
+    def pending(self):
+        """
+        :return dict snapshot of the entries not in the database yet
+        """
+        with self._lock:
+            return self._merged(self._in_flight, self._pending)
+
+    def __len__(self):
+        # a key buffered again while it is written counts twice; this is
+        # mostly asked for whether anything is buffered at all
+        return len(self._pending) + len(self._in_flight)
+
+    def flush(self):
+        """
+        Writes everything buffered so far. Entries stay visible to `get`
+        until they are written, and are kept for the next flush if the
+        write fails.
+
+        :return int number of flushed entries
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._in_flight, self._pending = self._pending, {}
+
+            try:
+                self.write(self._in_flight)
+            except Exception:
+                with self._lock:
+                    self._pending = self._merged(
+                        self._in_flight,
+                        self._pending
+                    )
+                    self._in_flight = {}
+                raise
+
+            with self._lock:
+                flushed, self._in_flight = len(self._in_flight), {}
+            return flushed
+
+    def _start(self):
+        if not self._flushes_at_exit:
+            atexit.register(self._flush_at_exit)
+            self._flushes_at_exit = True
+
+        if self._thread is not None or self.interval <= 0:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name=type(self).__name__,
+            daemon=True
+        )
+        self._thread.start()
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('%s flush at exit failed', type(self).__name__)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('%s flush failed', type(self).__name__)
+            finally:
+                # the flusher thread owns its connection
+                connection.close()